@@ -1,19 +1,46 @@
 from __future__ import annotations
 
+from array import array
 import asyncio
-from collections.abc import Callable
+import bisect
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor
+import functools
+import gzip
 import hashlib
+import itertools
 import json
 import logging
 import math
 import random
 import ssl
 import string
+import struct
 import time
 import uuid
 
 from websockets.asyncio.client import ClientConnection, connect as wsconnect
 
+try:
+    import numpy as np
+except ImportError:  # vectorised ramps are optional
+    np = None
+
+try:
+    import orjson
+except ImportError:  # faster decoding is optional
+    orjson = None
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def json_dumps(obj) -> str:
+    # frames must go out as text, orjson produces bytes
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
 class TagoMessage:
     PROP_DST = 'dst'
     PROP_RSP = 'rsp'
@@ -22,6 +49,11 @@ class TagoMessage:
     PROP_REF = 'ref'
     PROP_EVT = 'evt'
 
+    __slots__ = ('rsp', 'data', 'src', 'ref', 'evt', 'dst', 'req')
+
+    # request keys that say how a change is made, a request carrying any of them replaces all of them
+    TIMING_PROPS = ('duration', 'rate')
+
     @staticmethod
     def create_random_str(n: int = 6) -> str:
         return ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(n))
@@ -36,46 +68,58 @@ class TagoMessage:
         self.req = None
 
     @classmethod
-    def from_payload(cls, message: str):
+    def from_payload(cls, message: str | bytes):
+        """Decode a frame, the envelope fields are left in place in ``data``"""
         self = cls()
-        #print('>> ' + str(message))
-        data = json.loads(message)
+        data = json_loads(message)
         self.data = data
         self.rsp = data.get(TagoMessage.PROP_RSP)
         self.src = data.get(TagoMessage.PROP_SRC, '')
         self.ref = data.get(TagoMessage.PROP_REF)
         self.evt = data.get(TagoMessage.PROP_EVT)
 
-        if TagoMessage.PROP_REF in data:
-            del data[TagoMessage.PROP_REF]
-        if TagoMessage.PROP_SRC in data:
-            del data[TagoMessage.PROP_SRC]
-        if TagoMessage.PROP_EVT in data:
-            del data[TagoMessage.PROP_EVT]
-        if TagoMessage.PROP_RSP in data:
-            del data[TagoMessage.PROP_RSP]
-
         return self
 
     @classmethod
-    def make_request(cls, req: str, data: dict, dst: str = None):
+    def make_request(cls, req: str, data: dict, dst: str = None, ref: str = None):
         self = cls()
         self.dst = dst
         self.req = req
         self.data = data
+        self.ref = ref
 
         return self
 
+    @staticmethod
+    def merge_data(older: dict | None, newer: dict | None) -> dict:
+        """Data of two requests to the same load combined, keys of the newer request win"""
+        if not older:
+            return dict(newer or ())
+        if not newer:
+            return dict(older)
+        timed = any(key in newer for key in TagoMessage.TIMING_PROPS)
+        data = {key: value for key, value in older.items()
+                if not (timed and key in TagoMessage.TIMING_PROPS)}
+        data.update(newer)
+        return data
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def frame_prefix(dst: str | None, req: str) -> str:
+        """Serialized start of a request frame, up to and including the ref key"""
+        head = {TagoMessage.PROP_DST: dst} if dst else dict()
+        head[TagoMessage.PROP_REQ] = req
+        return json_dumps(head)[:-1] + f',"{TagoMessage.PROP_REF}":'
+
     def get_message(self) -> str:
-        data = self.data
-        if self.dst:
-            data[TagoMessage.PROP_DST] = self.dst
-        data[TagoMessage.PROP_REF] = TagoMessage.create_random_str()
-        data[TagoMessage.PROP_REQ] = self.req
-
-        msg = json.dumps(data)
-        #print('<< ' + str(msg))
-        return msg
+        """Encode the request, the caller's data dict is left untouched"""
+        if self.ref is None:
+            self.ref = TagoMessage.create_random_str()
+
+        msg = TagoMessage.frame_prefix(self.dst, self.req) + json_dumps(self.ref)
+        if not self.data:
+            return msg + '}'
+        return msg + ',' + json_dumps(self.data)[1:]
 
     @property
     def content(self):
@@ -108,6 +152,570 @@ class TagoMessage:
         return (self.req and self.req in req)
 
 
+class TagoLatencyHistogram:
+    """Fixed-bucket histogram of round trip times in seconds"""
+    BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+               0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+    # for work that stays within the process, such as frame to event bus
+    LOCAL_BUCKETS = (0.00005, 0.0001, 0.0002, 0.0005, 0.001, 0.002,
+                     0.005, 0.01, 0.02, 0.05, 0.1)
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.BUCKETS = buckets
+        self._counts: list[int] = [0] * (len(self.BUCKETS) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.timeouts: int = 0
+
+    def record(self, seconds: float) -> None:
+        self._counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def record_timeout(self) -> None:
+        self.timeouts += 1
+
+    def percentile(self, p: float) -> float | None:
+        """Estimate the ``p`` (0.0-1.0) quantile, interpolating within its bucket"""
+        if not self.count:
+            return None
+
+        rank = p * self.count
+        seen = 0
+        for i, n in enumerate(self._counts):
+            if n and seen + n >= rank:
+                low = self.BUCKETS[i - 1] if i > 0 else 0.0
+                high = self.BUCKETS[i] if i < len(self.BUCKETS) else self.BUCKETS[-1]
+                return low + (high - low) * ((rank - seen) / n)
+            seen += n
+        return self.BUCKETS[-1]
+
+    def stats(self) -> dict:
+        return {
+            'count': self.count,
+            'timeouts': self.timeouts,
+            'mean': (self.total / self.count) if self.count else None,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+        }
+
+
+class TagoWireRecorder:
+    """Ring buffer of raw frames with monotonic timestamps.
+
+    ``dump`` appends the buffered frames to a gzip file as (timestamp,
+    direction, length) headers followed by the UTF-8 payload, ``load`` reads
+    such a file back.
+    """
+    DIRECTION_IN = 0
+    DIRECTION_OUT = 1
+    HEADER = struct.Struct('<dBI')
+    SIZE = 10000
+
+    def __init__(self, size: int = SIZE):
+        self._frames: deque[tuple[float, int, str]] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def record(self, direction: int, payload: str) -> None:
+        self._frames.append((time.monotonic(), direction, payload))
+
+    def dump(self, path: str) -> int:
+        """Append and clear the buffered frames, blocking, returns the number written"""
+        frames, self._frames = self._frames, deque(maxlen=self._frames.maxlen)
+        with gzip.open(path, 'ab') as f:
+            for timestamp, direction, payload in frames:
+                data = payload.encode('utf-8') if isinstance(payload, str) else payload
+                f.write(self.HEADER.pack(timestamp, direction, len(data)))
+                f.write(data)
+        return len(frames)
+
+    @classmethod
+    def load(cls, path: str) -> Iterator[tuple[float, int, str]]:
+        with gzip.open(path, 'rb') as f:
+            while header := f.read(cls.HEADER.size):
+                if len(header) < cls.HEADER.size:
+                    raise ValueError(f'Truncated recording {path}')
+                timestamp, direction, length = cls.HEADER.unpack(header)
+                yield timestamp, direction, f.read(length).decode('utf-8')
+
+
+class TagoTraceBuffer:
+    """Ring buffer of frame summaries, for tracing traffic without logging every frame"""
+    DIRECTION_IN = 'in'
+    DIRECTION_OUT = 'out'
+    SIZE = 2000
+
+    def __init__(self, size: int = SIZE):
+        self._events: deque[tuple] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def record(self, direction: str, ref: str, kind: str, peer: str, size: int) -> None:
+        self._events.append((time.monotonic(), direction, ref, kind, peer, size))
+
+    def dump(self) -> list[dict]:
+        return [
+            {'time': timestamp, 'dir': direction, 'ref': ref, 'kind': kind, 'peer': peer, 'size': size}
+            for timestamp, direction, ref, kind, peer, size in self._events
+        ]
+
+
+class TagoOutboundFrame:
+    """A queued frame, refs of frames it replaced are kept in ``superseded``"""
+    __slots__ = ('ref', 'payload', 'key', 'req', 'message', 'enqueued', 'superseded', 'sealed')
+
+    def __init__(self, ref: str, payload: str, key: tuple = None, req: str = None, message: TagoMessage = None):
+        self.ref = ref
+        self.payload = payload
+        self.key = key
+        self.req = req
+        self.message = message
+        self.enqueued = time.monotonic()
+        self.superseded: list[str] = list()
+        # set once a later uncoalesced frame to the same destination was queued behind it
+        self.sealed: bool = False
+
+    def replace(self, ref: str, payload: str, message: TagoMessage = None) -> None:
+        """Stand in for a newer frame, keys only the older request set are kept"""
+        if message is not None and self.message is not None:
+            message = TagoMessage.make_request(req=message.req, dst=message.dst, ref=ref,
+                                               data=TagoMessage.merge_data(self.message.data, message.data))
+            payload = message.get_message()
+        self.superseded.append(self.ref)
+        self.ref = ref
+        self.payload = payload
+        self.message = message
+        self.enqueued = time.monotonic()
+
+
+class TagoSendQueue:
+    """Prioritised outbound queue drained by a single writer task.
+
+    At most ``window`` frames are kept waiting for a reply, a frame's slot is
+    released when its reply arrives or after ``ack_timeout`` seconds. An optional
+    ``rate`` caps the number of frames written per second. Round trip times,
+    from queueing to the reply, are kept per request type, also for replies
+    arriving after the slot was released. A frame only counts as timed out
+    when no reply came within ``lost_timeout`` seconds.
+
+    Frames put with a coalescing ``key`` are latest-wins: while a frame for the
+    same key is still queued, in flight or inside the ``spacing`` interval, a
+    newer frame replaces the pending one instead of being queued behind it.
+    When both frames were put with their request, the data is merged so keys
+    only the older request set are still sent. An uncoalesced frame put for a
+    destination with a pending keyed frame seals that frame: it is sent first,
+    without waiting out the spacing, and no longer takes newer frames.
+    """
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_BULK = 1
+    PRIORITY_DIAGNOSTIC = 2
+
+    MAX_DEPTH = 512
+    WINDOW = 16
+    ACK_TIMEOUT = 1.0
+    # seconds without a reply before a frame counts as lost, beyond the slowest latency bucket
+    LOST_TIMEOUT = 10.0
+    # minimum seconds between two frames with the same coalescing key
+    SPACING = 0.05
+
+    def __init__(self, maxsize: int = MAX_DEPTH, window: int = WINDOW, rate: float = None,
+                 ack_timeout: float = ACK_TIMEOUT, spacing: float = SPACING, lost_timeout: float = LOST_TIMEOUT):
+        self._maxsize = maxsize
+        self._window = window
+        self._interval = (1 / rate) if rate else 0.0
+        self._ack_timeout = ack_timeout
+        self._lost_timeout = max(lost_timeout, ack_timeout)
+        self._spacing = spacing
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize)
+        self._slots: asyncio.Semaphore = asyncio.Semaphore(window)
+        self._inflight: dict[str, tuple[asyncio.TimerHandle, TagoOutboundFrame]] = dict()
+        # frames whose slot was released without a reply, still waiting for a late one
+        self._late: dict[str, tuple[asyncio.TimerHandle, TagoOutboundFrame]] = dict()
+        self._latency: dict[str, TagoLatencyHistogram] = dict()
+        self._latency_all: TagoLatencyHistogram = TagoLatencyHistogram()
+        self._seq = itertools.count()
+        self._task: asyncio.Task = None
+        self._last_write: float = 0.0
+        self.recorder: TagoWireRecorder = None
+        # latest-wins bookkeeping, by coalescing key
+        self._queued: dict[tuple, tuple] = dict()
+        self._held: dict[tuple, tuple] = dict()
+        self._held_timers: dict[tuple, asyncio.TimerHandle] = dict()
+        self._inflight_keys: dict[str, tuple] = dict()
+        self._key_inflight: set[tuple] = set()
+        self._key_last_write: dict[tuple, float] = dict()
+        self._superseded: dict[str, list[str]] = dict()
+        self._sent: int = 0
+        self._coalesced: int = 0
+        self._max_depth: int = 0
+        self._latency_total: float = 0.0
+        self._latency_max: float = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth,
+            'max_depth': self._max_depth,
+            'inflight': self.inflight,
+            'sent': self._sent,
+            'coalesced': self._coalesced,
+            'queue_latency_avg': (self._latency_total / self._sent) if self._sent else 0.0,
+            'queue_latency_max': self._latency_max,
+        }
+
+    @property
+    def latency(self) -> TagoLatencyHistogram:
+        """Round trip times of all request types together"""
+        return self._latency_all
+
+    def latency_stats(self) -> dict[str, dict]:
+        return {req: histogram.stats() for req, histogram in self._latency.items()}
+
+    def start(self, ws: ClientConnection) -> None:
+        self.stop()
+        self._task = asyncio.create_task(self.task(ws))
+
+    def stop(self) -> None:
+        """Stop the writer and drop everything still queued or in flight"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for handle, frame in self._inflight.values():
+            handle.cancel()
+        for handle, frame in self._late.values():
+            handle.cancel()
+        for handle in self._held_timers.values():
+            handle.cancel()
+        self._inflight.clear()
+        self._late.clear()
+        self._queued.clear()
+        self._held.clear()
+        self._held_timers.clear()
+        self._inflight_keys.clear()
+        self._key_inflight.clear()
+        self._superseded.clear()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._slots = asyncio.Semaphore(self._window)
+
+    async def put(self, ref: str, payload: str, priority: int = PRIORITY_INTERACTIVE, key: tuple = None, req: str = None, message: TagoMessage = None, dst: str = None) -> None:
+        """Queue a frame, only waits when the queue is full"""
+        if key is None and dst is not None:
+            self._seal(dst)
+        elif key is not None:
+            pending = self._queued.get(key) or self._held.get(key)
+            if pending is not None:
+                pending[2].replace(ref, payload, message)
+                self._coalesced += 1
+                return
+
+        entry = (priority, next(self._seq), TagoOutboundFrame(ref, payload, key, req, message))
+        if key is not None:
+            if key in self._key_inflight or self._spacing_left(key) > 0:
+                self._hold(entry)
+                return
+            self._queued[key] = entry
+
+        await self._queue.put(entry)
+        self._max_depth = max(self._max_depth, self._queue.qsize())
+
+    def acknowledge(self, ref: str) -> list[str]:
+        """Release the slot of an answered frame, returns every ref the answer satisfies"""
+        inflight = self._inflight.pop(ref, None)
+        if inflight is not None:
+            handle, frame = inflight
+            handle.cancel()
+            self._slots.release()
+            self._record_latency(frame, False)
+            self._release_key(ref)
+        else:
+            late = self._late.pop(ref, None)
+            if late is not None:
+                handle, frame = late
+                handle.cancel()
+                self._record_latency(frame, False)
+
+        refs = self._superseded.pop(ref, None)
+        if refs is None:
+            return [ref]
+        refs.append(ref)
+        return refs
+
+    def _window_expired(self, ref: str) -> None:
+        """Free the slot of a frame not answered within ack_timeout, a late reply is still timed"""
+        handle, frame = self._inflight.pop(ref)
+        self._slots.release()
+        self._release_key(ref)
+        self._late[ref] = (asyncio.get_running_loop().call_later(
+            self._lost_timeout - self._ack_timeout, self._lost, ref), frame)
+
+    def _lost(self, ref: str) -> None:
+        handle, frame = self._late.pop(ref)
+        self._superseded.pop(ref, None)
+        self._record_latency(frame, True)
+
+    def _release_key(self, ref: str) -> None:
+        key = self._inflight_keys.pop(ref, None)
+        if key is not None:
+            self._key_inflight.discard(key)
+            if key in self._held and key not in self._held_timers:
+                self._release_held(key)
+
+    def _record_latency(self, frame: TagoOutboundFrame, timed_out: bool) -> None:
+        histogram = self._latency.get(frame.req)
+        if histogram is None:
+            histogram = self._latency[frame.req] = TagoLatencyHistogram()
+
+        if timed_out:
+            histogram.record_timeout()
+            self._latency_all.record_timeout()
+        else:
+            rtt = time.monotonic() - frame.enqueued
+            histogram.record(rtt)
+            self._latency_all.record(rtt)
+
+    def _seal(self, dst: str) -> None:
+        """Keep pending keyed frames to ``dst`` ahead of an uncoalesced frame put after them"""
+        for key in [key for key in self._queued if key[0] == dst]:
+            self._queued.pop(key)[2].sealed = True
+        for key in [key for key in self._held if key[0] == dst]:
+            handle = self._held_timers.pop(key, None)
+            if handle is not None:
+                handle.cancel()
+            entry = self._held.pop(key)
+            entry[2].sealed = True
+            try:
+                self._queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                asyncio.create_task(self._queue.put(entry))
+
+    def _spacing_left(self, key: tuple) -> float:
+        last = self._key_last_write.get(key)
+        if last is None:
+            return 0.0
+        return last + self._spacing - time.monotonic()
+
+    def _hold(self, entry: tuple) -> None:
+        """Park a keyed frame until its predecessor is answered and the spacing has passed"""
+        key = entry[2].key
+        self._held[key] = entry
+        if key not in self._key_inflight:
+            self._release_held(key)
+
+    def _release_held(self, key: tuple) -> None:
+        self._held_timers.pop(key, None)
+        wait = self._spacing_left(key)
+        if wait > 0:
+            self._held_timers[key] = asyncio.get_running_loop().call_later(
+                wait, self._release_held, key)
+            return
+
+        entry = self._held.pop(key)
+        self._queued[key] = entry
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            asyncio.create_task(self._queue.put(entry))
+
+    async def task(self, ws: ClientConnection) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            entry = await self._queue.get()
+            frame: TagoOutboundFrame = entry[2]
+            if frame.key is not None and not frame.sealed and self._spacing_left(frame.key) > 0:
+                del self._queued[frame.key]
+                self._hold(entry)
+                continue
+
+            await self._slots.acquire()
+
+            if self._interval:
+                delay = self._last_write + self._interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            # from here on the frame can no longer be replaced
+            if frame.key is not None:
+                if self._queued.get(frame.key) is entry:
+                    del self._queued[frame.key]
+                self._inflight_keys[frame.ref] = frame.key
+                self._key_inflight.add(frame.key)
+            if frame.superseded:
+                self._superseded[frame.ref] = frame.superseded
+
+            ref = frame.ref
+            self._inflight[ref] = (loop.call_later(
+                self._ack_timeout, self._window_expired, ref), frame)
+            if self.recorder is not None:
+                self.recorder.record(TagoWireRecorder.DIRECTION_OUT, frame.payload)
+            try:
+                await ws.send(frame.payload)
+            except Exception as e:
+                logging.debug("send failed, stopping writer: %s", e)
+                return
+
+            self._last_write = time.monotonic()
+            if frame.key is not None:
+                self._key_last_write[frame.key] = self._last_write
+            latency = self._last_write - frame.enqueued
+            self._sent += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+
+
+class TagoReconnectPolicy:
+    """Reconnect delays with an immediate first retry then exponential backoff with full jitter.
+
+    The backoff resets once a connection has stayed up for ``stable`` seconds.
+    The outcome of every attempt is kept in a short history.
+    """
+    BASE = 0.5
+    CAP = 60.0
+    STABLE = 30.0
+    HISTORY = 32
+
+    def __init__(self, base: float = BASE, cap: float = CAP, stable: float = STABLE, history: int = HISTORY):
+        self._base = base
+        self._cap = cap
+        self._stable = stable
+        self._failures: int = 0
+        self._connected_at: float = None
+        self._attempts: deque[dict] = deque(maxlen=history)
+
+    @property
+    def attempts(self) -> list[dict]:
+        return list(self._attempts)
+
+    @property
+    def failures(self) -> int:
+        """Consecutive attempts since the last stable connection"""
+        return self._failures
+
+    def record(self, outcome: str, error: Exception = None) -> None:
+        self._attempts.append({
+            'time': time.time(),
+            'outcome': outcome,
+            'error': None if error is None else repr(error),
+        })
+
+    def connected(self) -> None:
+        self._connected_at = time.monotonic()
+        self.record('connected')
+
+    def next_delay(self) -> float:
+        """Seconds to wait before the next attempt, to be called once per ended attempt"""
+        if self._connected_at is not None and time.monotonic() - self._connected_at >= self._stable:
+            self._failures = 0
+        self._connected_at = None
+
+        failures = self._failures
+        self._failures += 1
+        if failures == 0:
+            return 0.0
+        return random.uniform(0, min(self._cap, self._base * (2 ** min(failures - 1, 32))))
+
+
+class TagoBinding:
+    """An action run on a set of loads when a keypad input occurs, without leaving the receive loop"""
+    __slots__ = ('action', 'targets', 'level', 'step', 'duration', 'levels')
+
+    ACTION_TOGGLE = 'toggle'
+    ACTION_ON = 'on'
+    ACTION_OFF = 'off'
+    ACTION_DIM_UP = 'dim_up'
+    ACTION_DIM_DOWN = 'dim_down'
+    ACTION_SCENE = 'scene'
+    ACTIONS = (ACTION_TOGGLE, ACTION_ON, ACTION_OFF, ACTION_DIM_UP, ACTION_DIM_DOWN, ACTION_SCENE)
+
+    PROP_KEYPAD = 'keypad'
+    PROP_KEY = 'key'
+    PROP_EVENT = 'event'
+    PROP_ACTION = 'action'
+    PROP_TARGETS = 'targets'
+    PROP_LEVEL = 'level'
+    PROP_STEP = 'step'
+    PROP_DURATION = 'duration'
+    PROP_LEVELS = 'levels'
+    DEFAULT_EVENT = 'key_pressed'
+    DEFAULT_STEP = 0.1
+
+    def __init__(self, action: str, targets: list[str] = None, level: float = 1.0, step: float = DEFAULT_STEP,
+                 duration: float = None, levels: dict[str, float] = None):
+        if action not in self.ACTIONS:
+            raise ValueError(f'Unknown binding action {action}')
+        if action == self.ACTION_SCENE and not levels:
+            raise ValueError('A scene binding needs levels')
+        if action != self.ACTION_SCENE and not targets:
+            raise ValueError(f'A {action} binding needs targets')
+        self.action = action
+        # a scene targets the loads it has a level for
+        self.targets: tuple[str, ...] = tuple(levels) if action == self.ACTION_SCENE else tuple(targets or ())
+        self.level = level
+        self.step = step
+        self.duration = duration
+        self.levels: dict[str, float] = dict(levels or {})
+
+    @classmethod
+    def from_json(cls, json: dict) -> tuple[tuple, TagoBinding]:
+        """Parse one binding, returns the input it is bound to and the binding"""
+        source = (TagoBase.EVT_KEYPAD, json[cls.PROP_KEYPAD], json.get(cls.PROP_KEY),
+                  json.get(cls.PROP_EVENT, cls.DEFAULT_EVENT))
+        return source, cls(json[cls.PROP_ACTION], json.get(cls.PROP_TARGETS), json.get(cls.PROP_LEVEL, 1.0),
+                           json.get(cls.PROP_STEP, cls.DEFAULT_STEP), json.get(cls.PROP_DURATION),
+                           json.get(cls.PROP_LEVELS))
+
+    @staticmethod
+    def is_on(entity: TagoEntity) -> bool:
+        if isinstance(entity, TagoLight):
+            return entity._brightness > 0
+        if isinstance(entity, TagoCover):
+            # a cover is on when it is not fully closed
+            return entity.position < TagoCover.CLOSED
+        return entity.state == TagoBase.STATE_ON
+
+    async def set_on(self, entity: TagoEntity, on: bool) -> None:
+        if isinstance(entity, TagoLight):
+            await entity.set_brightness(self.level if on else 0.0, duration=self.duration)
+        elif isinstance(entity, (TagoSwitch, TagoFan)):
+            await (entity.turn_on() if on else entity.turn_off())
+        elif isinstance(entity, TagoCover):
+            await entity.move_to(TagoCover.OPEN if on else TagoCover.CLOSED)
+
+    async def run(self, device: TagoDevice, entities: list[TagoEntity]) -> None:
+        if self.action == self.ACTION_SCENE:
+            lights = {entity.unique_id: self.levels[entity.unique_id] for entity in entities if isinstance(entity, TagoLight)}
+            if lights:
+                await device.apply_scene(lights, duration=self.duration)
+            for entity in entities:
+                if not isinstance(entity, TagoLight):
+                    await self.set_on(entity, self.levels[entity.unique_id] > 0)
+            return
+
+        if self.action == self.ACTION_TOGGLE:
+            # like a wall switch, anything on turns the whole group off
+            on = not any(self.is_on(entity) for entity in entities)
+        else:
+            on = self.action == self.ACTION_ON
+
+        for entity in entities:
+            if self.action in (self.ACTION_DIM_UP, self.ACTION_DIM_DOWN):
+                if isinstance(entity, TagoLight):
+                    step = self.step if self.action == self.ACTION_DIM_UP else -self.step
+                    await entity.adjust_brightness(step, duration=self.duration)
+            else:
+                await self.set_on(entity, on)
+
+
 class TagoBase:
     PROP_TYPE = "type"
     PROP_ID = "id"
@@ -122,6 +730,9 @@ class TagoBase:
     EVT_KEYPAD = "keypad_evt"    
     EVT_MOTION = "motion_evt"
     EVT_IO = "io_evt"
+    EVT_INPUTS = (EVT_KEYPAD, EVT_MOTION, EVT_IO)
+    PROP_KEY = "key"
+    PROP_EVENT = "event"
         
     STATE_ON = "ON"
     STATE_OFF = "OFF"
@@ -147,6 +758,8 @@ class TagoEntity(TagoBase):
     EVT_KEYRELEASE = "key_released"
     VALUE_UNUSED = 'UNUSED'
     MAX_VALUE = 1000
+    # seconds a predicted state is shown before it is rolled back, unless the device reports a state
+    PREDICTION_TIMEOUT = 3.0
 
 
     types = []
@@ -159,6 +772,15 @@ class TagoEntity(TagoBase):
         self._type: str = json.get(TagoEntity.PROP_TYPE, self.VALUE_UNUSED)
         self._fault: list[str] = list()
         self._tag = json.get(TagoEntity.PROP_TAG)
+        self._retired: bool = False
+        self._prediction: dict = None
+        self._prediction_previous: dict = None
+        self._prediction_timer: asyncio.TimerHandle = None
+        # commands sent since the last state report, they count for PREDICTION_TIMEOUT at most
+        self._unsettled: int = 0
+        self._unsettled_until: float = 0.0
+        # whether the device has reported the state since the connection came up
+        self._state_known: bool = False
 
         # if len(self._location.strip()):
         #     info = DeviceInfo(
@@ -198,7 +820,29 @@ class TagoEntity(TagoBase):
 
     @property
     def is_connected(self) -> bool:
-        return self._device.is_connected
+        return self._device.is_connected and not self._retired
+
+    @property
+    def is_retired(self) -> bool:
+        return self._retired
+
+    def apply_config(self, json: dict) -> bool:
+        """Update metadata in place from a list_nodes entry, returns True if anything changed"""
+        name = json.get(TagoEntity.PROP_NAME)
+        location = json.get(TagoEntity.PROP_LOCATION)
+        tag = json.get(TagoEntity.PROP_TAG)
+        if name == self._name and location == self._location and tag == self._tag:
+            return False
+
+        self._name = name
+        self._location = location
+        self._tag = tag
+        return True
+
+    def retire(self) -> None:
+        """Mark the entity as no longer present on the device"""
+        self._retired = True
+        self.update()
 
     @property
     def fault(self) -> list[str]:
@@ -208,17 +852,126 @@ class TagoEntity(TagoBase):
     def has_fault(self) -> bool:
         return len(self._fault) > 0
 
+    @property
+    def is_ramp_active(self) -> bool:
+        return False
+
     def is_unused(self) -> bool:
         return self.type == self.VALUE_UNUSED
 
     async def connection_state_changed(self, connected: bool) -> None:
+        if not connected:
+            self._state_known = False
+            self.rollback()
+        self.update()
+
+    async def refresh_state(self, responseTimeout: float = None, priority: int = TagoSendQueue.PRIORITY_BULK) -> None | TagoMessage:
+        return await self.send_request(req=self.REQ_GET_STATE, responseTimeout=responseTimeout, priority=priority)
+
+    async def send_request(self, req: str, data: dict = None, responseTimeout: float = None, priority: int = TagoSendQueue.PRIORITY_INTERACTIVE, coalesce: bool = False, predict: dict = None, duration: float = None, force: bool = False) -> None | TagoMessage:
+        """ ``predict`` is the state the request is expected to lead to, shown right away in optimistic mode
+            (reached over ``duration`` seconds) and settled by the next state the device reports.
+            Unless ``force`` is set the request is not sent when the entity is already in that state. """
+        if predict is not None and self.suppress(predict, force):
+            return None
+
+        if predict is None or not self.command_started(predict, duration):
+            return await self._device.send_request(req=req, dst=self._eid, data=data, responseTimeout=responseTimeout, priority=priority, coalesce=coalesce)
+
+        try:
+            ack = await self._device.send_request(req=req, dst=self._eid, data=data, responseTimeout=responseTimeout, priority=priority, coalesce=coalesce)
+        except BaseException:
+            self.rollback()
+            raise
+        if ack is not None and ack.data.get('error'):
+            self.rollback()
+        return ack
+
+    def suppress(self, predict: dict, force: bool = False) -> bool:
+        """Whether a command leading to ``predict`` is redundant and should not be sent, counting it if so"""
+        if not force and self._device.suppress_redundant and self.is_redundant(predict):
+            self._device.command_suppressed()
+            return True
+        return False
+
+    def command_started(self, predict: dict, duration: float = None) -> bool:
+        """Note a command leading to ``predict`` is being sent, returns True if the state was predicted"""
+        self._unsettled += 1
+        self._unsettled_until = time.monotonic() + self.PREDICTION_TIMEOUT
+        if not self._device.optimistic or not self.is_connected:
+            return False
+        self.predict(predict, duration)
+        return True
+
+    @property
+    def has_prediction(self) -> bool:
+        return self._prediction is not None
+
+    def is_redundant(self, state: dict) -> bool:
+        """Whether the last confirmed state already is ``state``"""
+        if not self._state_known or self._prediction is not None or self.is_ramp_active:
+            return False
+        if self._unsettled and time.monotonic() < self._unsettled_until:
+            # a command still on its way may change the state
+            return False
+        current = self.export_state()
+        return all(key in current and current[key] == value for key, value in state.items())
+
+    def predict(self, state: dict, duration: float = None) -> None:
+        """Show ``state`` as if the device had reported it"""
+        if self._prediction is None:
+            self._prediction_previous = self.export_state()
+        else:
+            self._prediction_timer.cancel()
+        self._prediction = state
+        self._prediction_timer = asyncio.get_running_loop().call_later(self.PREDICTION_TIMEOUT, self.rollback)
+        self._device.prediction_stats['predicted'] += 1
+        self.apply_prediction(state, duration)
+        self.update()
+
+    def apply_prediction(self, state: dict, duration: float = None) -> None:
+        self.parse_state_json(state)
+
+    def rollback(self) -> None:
+        """Return to the state from before the outstanding prediction"""
+        if self._prediction is None:
+            return
+        self._prediction_timer.cancel()
+        previous = self._prediction_previous
+        self._prediction = self._prediction_previous = self._prediction_timer = None
+        self._device.prediction_stats['rolled_back'] += 1
+        self.apply_prediction(previous)
         self.update()
-        if connected:
-            # request state refresh
-            await self.send_request(req=self.REQ_GET_STATE)        
 
-    async def send_request(self, req: str, data: dict = {}) -> None:
-        await self._device.send_request(req=req, dst=self._eid, data=data)
+    def reported_state(self, data: dict) -> dict:
+        """The state a device report leads to, compared against predictions"""
+        return data
+
+    @staticmethod
+    def same_value(predicted, reported) -> bool:
+        if isinstance(predicted, bool) or isinstance(reported, bool) or \
+                not isinstance(predicted, (int, float)) or not isinstance(reported, (int, float)):
+            return predicted == reported
+        # device values are integer steps, colour points are floats
+        tolerance = 1 if isinstance(predicted, int) and isinstance(reported, int) else 1e-3
+        return abs(predicted - reported) <= tolerance
+
+    def state_reported(self, msg: TagoMessage) -> None:
+        if not msg.data.get('error'):
+            self._state_known = True
+        if self._unsettled:
+            self._unsettled -= 1
+        if self._prediction is not None:
+            self.settle_prediction(msg.content)
+
+    def settle_prediction(self, data: dict) -> None:
+        """Confirm or count as a mismatch the outstanding prediction, the reported state then applies"""
+        reported = self.reported_state(data)
+        matched = all(self.same_value(value, reported[key])
+                      for key, value in self._prediction.items() if key in reported)
+        self._prediction_timer.cancel()
+        self._prediction = self._prediction_previous = self._prediction_timer = None
+        self._device.prediction_stats['confirmed' if matched else 'mismatched'] += 1
 
     def handle_event(self, msg: TagoMessage) -> None:
         if msg.is_event(self.EVT_STATE_CHANGED):
@@ -231,8 +984,11 @@ class TagoEntity(TagoBase):
             return
 
         if msg.is_event():
+            if msg.evt == self.EVT_STATE_CHANGED:
+                self.state_reported(msg)
             self.handle_event(msg)
         elif msg.is_response(self.REQ_GET_STATE):
+            self.state_reported(msg)
             self.handle_state_change(msg)
         elif msg.is_response(self.REQ_GET_CONFIG):
             self.handle_config_change(msg)
@@ -243,6 +999,13 @@ class TagoEntity(TagoBase):
     def handle_config_change(self, msg: TagoMessage) -> None:
         self.update()
 
+    def parse_state_json(self, data: dict) -> None:
+        pass
+
+    def export_state(self) -> dict:
+        """Current state in the same shape as a state_changed payload"""
+        return dict()
+
     @staticmethod
     def convert_value_to_float(value: int, max=1.0) -> float:
         return ((value * max) / TagoEntity.MAX_VALUE)
@@ -256,10 +1019,23 @@ class TagoDevice(TagoBase):
     REQ_LIST_NODES = 'list_nodes'
     REQ_DEVICE_REBOOT = 'reboot'
     REQ_DEVICE_IDENTIFY = 'identify'
+    REQ_SET_LIGHTS = 'set_lights'
     PROP_NODES = 'nodes'
     PROP_LOADS = 'loads'
-
-    def __init__(self, hoststr: str, authkey: str = None, useSSL: bool = False):
+    PROP_FEATURES = 'features'
+    # controller accepts set_lights, one frame for many loads
+    FEATURE_MULTI_LOAD = 'multi_load'
+    # seconds scene commands are collected for before being sent together
+    SCENE_WINDOW = 0.005
+    # get_state requests kept in flight while resyncing after a connect
+    RESYNC_WINDOW = 16
+    RESYNC_TIMEOUT = 5.0
+    # seconds before another traceback is logged for a source whose frames keep failing
+    ERROR_LOG_INTERVAL = 3600.0
+
+    def __init__(self, hoststr: str, authkey: str = None, useSSL: bool = False,
+                 window: int = TagoSendQueue.WINDOW, rate: float = None):
+        """``window`` caps the requests awaiting a reply and ``rate`` the frames sent per second, see TagoSendQueue"""
         super().__init__(None)
         self._usessl = useSSL
         self._hoststr = hoststr
@@ -272,9 +1048,43 @@ class TagoDevice(TagoBase):
         self._ws: ClientConnection = None
         self._task: asyncio.Task = None
         self._running: bool = False
+        # set by disconnect() to cut a reconnect backoff short
+        self._stop_flag = asyncio.Event()
         self._connected_flag = asyncio.Event()
+        self._ramps: TagoRampEngine = TagoRampEngine()
         self._disconnected_flag = asyncio.Event()
         self._entities: list[TagoEntity] = list()
+        self._index: dict[str, TagoEntity] = dict()
+        self._unmatched_frames: int = 0
+        self._refs = itertools.count(1)
+        self._pending: dict[str, asyncio.Future] = dict()
+        self._sender: TagoSendQueue = TagoSendQueue(window=window, rate=rate)
+        self._recorder: TagoWireRecorder = None
+        self._trace: TagoTraceBuffer = None
+        # source -> when the last traceback for it was logged, cleared on every new connection
+        self._failing_sources: dict[str, float] = dict()
+        self._reconnect: TagoReconnectPolicy = TagoReconnectPolicy()
+        self._resync_task: asyncio.Task = None
+        self._resync_cb: Callable = None
+        self._resync_duration: float = None
+        self._resync_failures: int = 0
+        self._optimistic: bool = False
+        self._suppress_redundant: bool = True
+        self._suppressed: int = 0
+        self._features: set[str] = set()
+        self._scene_batch: dict[str, tuple[TagoLight, dict, dict, float]] = dict()
+        self._scene_waiters: list[asyncio.Future] = list()
+        self._scene_handle: asyncio.TimerHandle = None
+        self._prediction_stats: dict[str, int] = {'predicted': 0, 'confirmed': 0, 'mismatched': 0, 'rolled_back': 0}
+        self._topology_cb: Callable = None
+        self._nodes: dict = dict()
+        self._manager: TagoManager = None
+        self._connect_duration: float = None
+        self._inputs: set[tuple] = set()
+        self._input_cb: Callable = None
+        self._bindings: dict[tuple, list[TagoBinding]] = dict()
+        self._binding_tasks: set[asyncio.Task] = set()
+        self._received_at: float = 0.0
 
     @property
     def dashboard_uri(self):
@@ -306,6 +1116,110 @@ class TagoDevice(TagoBase):
     def entities(self):
         return self._entities
 
+    @property
+    def sender(self) -> TagoSendQueue:
+        return self._sender
+
+    @property
+    def reconnect_policy(self) -> TagoReconnectPolicy:
+        return self._reconnect
+
+    @property
+    def recorder(self) -> TagoWireRecorder | None:
+        return self._recorder
+
+    def enable_recorder(self, size: int = TagoWireRecorder.SIZE) -> TagoWireRecorder:
+        """Start keeping the last ``size`` raw frames in both directions"""
+        if self._recorder is None:
+            self._recorder = TagoWireRecorder(size)
+            self._sender.recorder = self._recorder
+        return self._recorder
+
+    def disable_recorder(self) -> None:
+        self._recorder = None
+        self._sender.recorder = None
+
+    @property
+    def trace(self) -> TagoTraceBuffer | None:
+        return self._trace
+
+    def enable_trace(self, size: int = TagoTraceBuffer.SIZE) -> TagoTraceBuffer:
+        """Start keeping a summary (direction, ref, req/evt, peer, size) of the last ``size`` frames"""
+        if self._trace is None:
+            self._trace = TagoTraceBuffer(size)
+        return self._trace
+
+    def disable_trace(self) -> None:
+        self._trace = None
+
+    def trace_incoming(self, msg: TagoMessage, size: int) -> None:
+        self._trace.record(TagoTraceBuffer.DIRECTION_IN, msg.ref,
+                           msg.evt or msg.rsp, msg.src, size)
+
+    @property
+    def ramps(self) -> TagoRampEngine:
+        return self._ramps
+
+    @property
+    def resync_duration(self) -> float | None:
+        """Seconds taken by the last completed state resync"""
+        return self._resync_duration
+
+    @property
+    def optimistic(self) -> bool:
+        """Whether entities show the state a command leads to before the device reports it"""
+        return self._optimistic
+
+    @optimistic.setter
+    def optimistic(self, value: bool) -> None:
+        self._optimistic = value
+
+    @property
+    def features(self) -> set[str]:
+        """Optional protocol features the controller announced at login"""
+        return self._features
+
+    @property
+    def suppress_redundant(self) -> bool:
+        """Whether commands for a state entities are already in are dropped"""
+        return self._suppress_redundant
+
+    @suppress_redundant.setter
+    def suppress_redundant(self, value: bool) -> None:
+        self._suppress_redundant = value
+
+    @property
+    def suppressed_commands(self) -> int:
+        """Number of commands not sent because they would not have changed anything"""
+        return self._suppressed
+
+    def command_suppressed(self) -> None:
+        self._suppressed += 1
+
+    @property
+    def prediction_stats(self) -> dict[str, int]:
+        """Optimistic predictions made, confirmed, contradicted by the device and rolled back"""
+        return self._prediction_stats
+
+    @property
+    def resync_failures(self) -> int:
+        """Number of entities that did not answer during the last resync"""
+        return self._resync_failures
+
+    @property
+    def manager(self) -> TagoManager | None:
+        return self._manager
+
+    @property
+    def connect_duration(self) -> float | None:
+        """Seconds the last successful connect took, from opening the socket to the node list"""
+        return self._connect_duration
+
+    @property
+    def unmatched_frames(self) -> int:
+        """Number of received frames whose source matched no known entity"""
+        return self._unmatched_frames
+
     @property
     def name(self):
         return self._name or f'Device {self.unique_id}'
@@ -314,11 +1228,241 @@ class TagoDevice(TagoBase):
     def is_connected(self):
         return self._ws is not None
     
+    @property
+    def inputs(self) -> set[tuple]:
+        """Every (evt, id, key, event) input seen from the controller"""
+        return self._inputs
+
+    def set_on_input_event(self, callback: Callable) -> None:
+        """``callback(input, msg, received)`` is called for each keypad, motion and io event,
+        ``received`` being the time.perf_counter() the frame arrived at"""
+        self._input_cb = callback
+
+    @property
+    def bindings(self) -> dict[tuple, list[TagoBinding]]:
+        return self._bindings
+
+    def set_bindings(self, bindings: list[dict]) -> None:
+        """Replace the keypad bindings, see TagoBinding.from_json for the format"""
+        table: dict[tuple, list[TagoBinding]] = dict()
+        for json in bindings:
+            try:
+                source, binding = TagoBinding.from_json(json)
+            except (KeyError, TypeError, ValueError) as e:
+                logging.error("ignoring keypad binding %s: %s", json, e)
+                continue
+            table.setdefault(source, list()).append(binding)
+        self._bindings = table
+
+    def run_bindings(self, bindings: list[TagoBinding]) -> None:
+        for binding in bindings:
+            entities = [entity for entity in map(self._index.get, binding.targets) if entity is not None]
+            if entities:
+                # the task runs on the next loop iteration, before any automation sees the event
+                task = asyncio.create_task(binding.run(self, entities))
+                self._binding_tasks.add(task)
+                task.add_done_callback(self._binding_done)
+
+    def _binding_done(self, task: asyncio.Task) -> None:
+        self._binding_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error("keypad binding failed: %s", task.exception())
+
     def input_event_message(self, msg: TagoMessage) -> None:
-        pass
+        data = msg.data
+        source = (msg.evt, data.get(TagoDevice.PROP_ID), data.get(TagoDevice.PROP_KEY),
+                  data.get(TagoDevice.PROP_EVENT))
+        self._inputs.add(source)
+        if self._bindings:
+            bindings = self._bindings.get(source)
+            if bindings is not None:
+                self.run_bindings(bindings)
+            if source[2] is not None:
+                # bindings without a key apply to every key of the keypad
+                bindings = self._bindings.get((source[0], source[1], None, source[3]))
+                if bindings is not None:
+                    self.run_bindings(bindings)
+        if self._input_cb is not None:
+            self._input_cb(source, msg, self._received_at)
+
+    def handle_device_message(self, msg: TagoMessage) -> None:
+        if msg.evt in TagoDevice.EVT_INPUTS:
+            self.input_event_message(msg)
+        elif msg.is_event([TagoDevice.EVT_CONFIG_CHANGED]):
+            pass
+
+    def set_on_topology_changed(self, callback: Callable) -> None:
+        self._topology_cb = callback
 
-    async def connect(self, timeout: float | None = None) -> None:
-        """Connect function that waits for connection or error with optional timeout."""
+    @staticmethod
+    def entity_class_for(type: str) -> type[TagoEntity]:
+        for cls in (TagoLight, TagoSwitch, TagoCover, TagoFan):
+            if cls.is_of_type(type):
+                return cls
+        return TagoEntity  # unused loads
+
+    def reconcile_nodes(self, nodes: dict) -> dict[str, list[str]]:
+        """Bring the entity list in line with a list_nodes reply.
+
+        Existing entities are updated in place, new loads are created and
+        loads that disappeared (or changed type) are retired. Returns the
+        ids that were added, removed and changed.
+        """
+        added: list[str] = list()
+        removed: list[str] = list()
+        changed: list[str] = list()
+        entities: list[TagoEntity] = list()
+        seen: set[str] = set()
+        self._nodes = nodes
+
+        for key, value in nodes.items():
+            for item in value.get(TagoDevice.PROP_LOADS, list()):
+                try:
+                    eid = item[TagoEntity.PROP_ID]
+                    cls = self.entity_class_for(item.get(TagoEntity.PROP_TYPE))
+                    entity = self._index.get(eid)
+                    if entity is not None and entity.type == item.get(TagoEntity.PROP_TYPE, TagoEntity.VALUE_UNUSED):
+                        if entity.apply_config(item):
+                            changed.append(eid)
+                    else:
+                        if entity is not None:
+                            removed.append(eid)
+                        entity = cls(item, self)
+                        added.append(eid)
+
+                    entities.append(entity)
+                    seen.add(eid)
+                except Exception as e:
+                    logging.exception(e)
+
+        for eid, entity in self._index.items():
+            if eid not in seen:
+                removed.append(eid)
+
+        if added or removed:
+            for eid in removed:
+                self._index[eid].retire()
+            self._entities = entities
+            self.rebuild_index()
+
+        summary = {'added': added, 'removed': removed, 'changed': changed}
+        if added or removed or changed:
+            logging.debug("topology of %s changed: %d added, %d removed, %d changed",
+                          self._eid, len(added), len(removed), len(changed))
+            if self._topology_cb:
+                self._topology_cb(summary)
+
+        return summary
+
+    def snapshot(self) -> dict:
+        """Last known identity, node list and entity states, for caching between runs"""
+        return {
+            'serialnum': self._serialnum,
+            'model': self._modelnum,
+            'firmware': self._firmware_rev,
+            TagoDevice.PROP_NODES: self._nodes,
+            'states': {entity.unique_id: entity.export_state() for entity in self._entities},
+            'inputs': sorted(self._inputs, key=repr),
+        }
+
+    def restore(self, snapshot: dict) -> None:
+        """Recreate entities and their last known state from a snapshot, without connecting"""
+        self._serialnum = snapshot.get('serialnum')
+        self._modelnum = snapshot.get('model')
+        self._firmware_rev = snapshot.get('firmware')
+        self._eid = self._serialnum
+        self.reconcile_nodes(snapshot.get(TagoDevice.PROP_NODES, dict()))
+        for eid, state in snapshot.get('states', dict()).items():
+            entity = self._index.get(eid)
+            if entity is not None:
+                entity.parse_state_json(state)
+        self._inputs.update(tuple(source) for source in snapshot.get('inputs', list()))
+
+    def rebuild_index(self) -> None:
+        """Rebuild the source id -> entity dispatch index after the node list changes"""
+        self._index = {entity.unique_id: entity for entity in self._entities}
+
+    def set_on_resync_complete(self, callback: Callable) -> None:
+        self._resync_cb = callback
+
+    async def resync(self) -> None:
+        """Refresh every entity's state, pipelining up to RESYNC_WINDOW get_state requests"""
+        started = time.monotonic()
+        entities = iter(list(self._entities))
+        failures = 0
+
+        async def worker() -> None:
+            nonlocal failures
+            for entity in entities:
+                try:
+                    await entity.refresh_state(responseTimeout=self.RESYNC_TIMEOUT)
+                except TimeoutError:
+                    failures += 1
+                except ConnectionError:
+                    return
+
+        await asyncio.gather(*(worker() for _ in range(min(self.RESYNC_WINDOW, len(self._entities)))))
+        if not self.is_connected:
+            return
+
+        self._resync_duration = time.monotonic() - started
+        self._resync_failures = failures
+        logging.debug("resynced %d entities of %s in %.3fs (%d failed)",
+                      len(self._entities), self._eid, self._resync_duration, failures)
+        if self._resync_cb:
+            self._resync_cb()
+
+    def next_ref(self) -> str:
+        return str(next(self._refs))
+
+    def fail_pending(self, error: Exception) -> None:
+        """Abort every request still waiting for a response"""
+        pending, self._pending = self._pending, dict()
+        for waiter in pending.values():
+            if not waiter.done():
+                waiter.set_exception(error)
+
+    def decode_frame(self, message: str) -> TagoMessage | None:
+        """Decode a received frame, frames from unknown sources are dropped unless they answer a request"""
+        msg = TagoMessage.from_payload(message)
+        src = msg.src
+        if src and src != self._eid and src not in self._index and msg.ref is None:
+            self._unmatched_frames += 1
+            return None
+        return msg
+
+    async def dispatch_message(self, msg: TagoMessage) -> None:
+        """Route a received frame to the device or the single entity it came from"""
+        if msg.ref is not None:
+            # an answer to a coalesced frame also answers the frames it replaced
+            for ref in self._sender.acknowledge(msg.ref):
+                waiter = self._pending.pop(ref, None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(msg)
+
+        try:
+            if msg.src == self._eid:
+                self.handle_device_message(msg)
+                return
+
+            entity = self._index.get(msg.src)
+            if entity is None:
+                self._unmatched_frames += 1
+                return
+
+            await entity.handle_message(msg)
+        except Exception as e:
+            # log the traceback once per source and interval, a faulty load or input callback would otherwise flood the log
+            now = time.monotonic()
+            logged = self._failing_sources.get(msg.src)
+            if logged is not None and now - logged < self.ERROR_LOG_INTERVAL:
+                logging.debug("error handling frame from %s: %s", msg.src, e)
+            else:
+                self._failing_sources[msg.src] = now
+                logging.exception(str(e))
+
+    def start(self) -> tuple[asyncio.Event, asyncio.Event]:
+        """Start the connection task without waiting, returns the (connected, autherror) flags"""
         # Create the two event flags
         connected = asyncio.Event()
         autherror = asyncio.Event()
@@ -329,8 +1473,14 @@ class TagoDevice(TagoBase):
         if self._task:
             self._task.cancel()
 
+        self._stop_flag.clear()
         self._task = asyncio.create_task(
             self.connection_task(connected, autherror))
+        return connected, autherror
+
+    async def connect(self, timeout: float | None = None) -> None:
+        """Connect function that waits for connection or error with optional timeout."""
+        connected, autherror = self.start()
         # try:
         # Wait for either connected or error to be set, with optional timeout
         done, pending = await asyncio.wait(
@@ -339,6 +1489,8 @@ class TagoDevice(TagoBase):
             return_when=asyncio.FIRST_COMPLETED,
             timeout=timeout
         )
+        for waiter in pending:
+            waiter.cancel()
 
         # Check if timeout occurred
         if not done:
@@ -354,8 +1506,12 @@ class TagoDevice(TagoBase):
 
     async def disconnect(self, timeout: float | None = None) -> None:
         self._running = False
+        self._stop_flag.set()
         if self._ws:
             await self._ws.close()
+        if self._task is None:
+            # already disconnected, e.g. by TagoManager.disconnect_all at shutdown
+            return
 
         if timeout is None:
             await self._task
@@ -370,62 +1526,79 @@ class TagoDevice(TagoBase):
             raise self._task.exception()
         self._task = None
 
-    async def send_request(self, req: str, data: dict = dict(), dst: str = None, responseTimeout: float = None) -> None | TagoMessage:
+    async def send_request(self, req: str, data: dict = None, dst: str = None, responseTimeout: float = None, priority: int = TagoSendQueue.PRIORITY_INTERACTIVE, coalesce: bool = False) -> None | TagoMessage:
         if self._ws is None:
             return None
 
-        """ sends a message to peer, and optionally waits for a response to be received or a timeout to occur. """
-        msg = TagoMessage.make_request(req=req, dst=dst, data=data)
-        resp: TagoMessage = None
-        flag = asyncio.Event()
+        """ sends a message to peer, and optionally waits for a response to be received or a timeout to occur.
+            coalesced requests replace any earlier request to the same destination that has not been sent yet. """
+        ref = self.next_ref()
+        msg = TagoMessage.make_request(req=req, dst=dst, data=data, ref=ref)
+        waiter: asyncio.Future = None
 
         if responseTimeout:
-            async def check_response(respmsg: TagoMessage):
-                nonlocal resp
-                if respmsg.refers_to(msg.reference):
-                    resp = respmsg
-                    flag.set()
+            waiter = asyncio.get_running_loop().create_future()
+            self._pending[ref] = waiter
 
         payload = msg.get_message()
-        logging.debug(f"=== outgoing {payload}")
-        await self._ws.send(payload)
-        if responseTimeout:
+        if self._trace is not None:
+            self._trace.record(TagoTraceBuffer.DIRECTION_OUT, ref, req, dst, len(payload))
+        try:
+            if coalesce:
+                await self._sender.put(ref, payload, priority, key=(dst, req), req=req, message=msg)
+            else:
+                await self._sender.put(ref, payload, priority, req=req, dst=dst)
+            if waiter is None:
+                return None
             async with asyncio.timeout(responseTimeout):
-                await flag.wait()
-                return resp
-
-    async def get_ssl_context(self) -> ssl.SSLContext:
-        def _create_context(self) -> ssl.SSLContext:
-            try:
-                ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-                ssl_context.check_hostname = False
-                ssl_context.set_ciphers('DEFAULT')
-                if self._ca:
-                    ssl_context.load_verify_locations(cadata=self._ca)
-                    ssl_context.verify_mode = ssl.CERT_REQUIRED
-                else:
-                    ssl_context.verify_mode = ssl.CERT_NONE
+                return await waiter
+        finally:
+            if waiter is not None:
+                self._pending.pop(ref, None)
 
-                return ssl_context
-            except Exception as e:
-                logging.exception(e)
+    @staticmethod
+    def create_ssl_context(ca: str = None) -> ssl.SSLContext:
+        try:
+            ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            ssl_context.check_hostname = False
+            ssl_context.set_ciphers('DEFAULT')
+            if ca:
+                ssl_context.load_verify_locations(cadata=ca)
+                ssl_context.verify_mode = ssl.CERT_REQUIRED
+            else:
+                ssl_context.verify_mode = ssl.CERT_NONE
+
+            return ssl_context
+        except Exception as e:
+            logging.exception(e)
 
+    async def get_ssl_context(self) -> ssl.SSLContext:
+        if self._manager is not None:
+            return await self._manager.get_ssl_context(self._ca)
         return await asyncio.get_running_loop().run_in_executor(
-            None, _create_context, self
+            None, TagoDevice.create_ssl_context, self._ca
         )
 
     async def connection_task(self, connected: asyncio.Event, autherror: asyncio.Event) -> None:
         self._running = True
         while self._running:
+            # managed devices take turns opening connections
+            slot = self._manager.connect_slot if self._manager is not None else None
+            holding = False
             try:
-                logging.debug(f"connecting to {self.uri}")
+                if slot is not None:
+                    await slot.acquire()
+                    holding = True
+                started = time.monotonic()
+                logging.debug("connecting to %s", self.uri)
                 if self._usessl:
                     ssl_context = await self.get_ssl_context()
                 else:
                     ssl_context = None
                 async with wsconnect(uri=self.uri, ping_timeout=1, ping_interval=3, close_timeout=5, ssl=ssl_context) as ws:
-                    logging.debug(f"connected to {self.uri}")
+                    logging.debug("connected to %s", self.uri)
                     self._ws = ws
+                    self._sender.start(ws)
                     # login
                     try:
                         await ws.send('{}')
@@ -435,6 +1608,7 @@ class TagoDevice(TagoBase):
                         serialnum = msg.get('serialnum')
                         model_num = msg.get('model')
                         firmware_rev = msg.get('firmware')
+                        self._features = set(msg.get(TagoDevice.PROP_FEATURES, list()))
 
                         if status != 200:
                             if msg.get('nonce') is None:
@@ -482,57 +1656,61 @@ class TagoDevice(TagoBase):
                     # refresh entities list and types
                     await self.send_request(req=TagoDevice.REQ_LIST_NODES)
                     async for message in ws:
-                        logging.debug(f"=== incoming {message}")
-                        msg = TagoMessage.from_payload(message)                        
-                        if msg.is_response([TagoDevice.REQ_LIST_NODES]):                            
-                            for key, value in msg.data.get(TagoDevice.PROP_NODES, dict()).items():                                
-                                for item in value.get(TagoDevice.PROP_LOADS, list()):
-                                    try: 
-                                        entity = None
-                                        if TagoLight.is_of_type(item.get(TagoEntity.PROP_TYPE)):
-                                            entity = TagoLight(item, self)
-                                        elif TagoSwitch.is_of_type(item.get(TagoEntity.PROP_TYPE)):
-                                            entity = TagoSwitch(item, self)
-                                        elif TagoCover.is_of_type(item.get(TagoEntity.PROP_TYPE)):
-                                            entity = TagoCover(item, self)
-                                        elif TagoFan.is_of_type(item.get(TagoEntity.PROP_TYPE)):
-                                            entity = TagoFan(item, self)
-                                        else: ## unused loads
-                                            entity = TagoEntity(item, self)
-
-                                        self._entities.append(entity)
-                                    except Exception as e:
-                                        logging.exception(e)
-
+                        if self._recorder is not None:
+                            self._recorder.record(TagoWireRecorder.DIRECTION_IN, message)
+                        msg = TagoMessage.from_payload(message)
+                        if self._trace is not None:
+                            self.trace_incoming(msg, len(message))
+                        if msg.is_response([TagoDevice.REQ_LIST_NODES]):
+                            # read here rather than dispatched, so release the request's window slot
+                            if msg.ref is not None:
+                                self._sender.acknowledge(msg.ref)
+                            self.reconcile_nodes(msg.data.get(TagoDevice.PROP_NODES, dict()))
                             break
                     
                     # connected to device!
-                    asyncio.sleep(0.5)
+                    self._connect_duration = time.monotonic() - started
+                    if holding:
+                        slot.release()
+                        holding = False
+                    self._failing_sources.clear()
                     connected.set()
+                    self._reconnect.connected()
+                    if self._manager is not None:
+                        self._manager.device_connected(self)
                     for entity in self._entities:
                         await entity.connection_state_changed(True)
                     self.update()
+                    # state replies are read by the loop below while the resync is in flight
+                    self._resync_task = asyncio.create_task(self.resync())
 
                     # process all messages from device
                     async for message in ws:
-                        msg = TagoMessage.from_payload(message)
-                        if msg.src == self._eid:
-                            if msg.is_event([TagoDevice.EVT_CONFIG_CHANGED]):
-                                pass
-                            elif msg.is_event([TagoDevice.EVT_KEYPAD, TagoDevice.EVT_MOTION, TagoDevice.EVT_IO]):
-                                self.input_event_message(msg)
-
-                        for entity in self._entities:
-                            try:
-                                await entity.handle_message(msg)
-                            except Exception as e:
-                                logging.exception(str(e))
+                        self._received_at = time.perf_counter()
+                        if self._recorder is not None:
+                            self._recorder.record(TagoWireRecorder.DIRECTION_IN, message)
+                        msg = self.decode_frame(message)
+                        if msg is not None:
+                            if self._trace is not None:
+                                self.trace_incoming(msg, len(message))
+                            await self.dispatch_message(msg)
+
+                self._reconnect.record('closed')
 
             except Exception as e:
                 logging.exception(str(e))
-                pass
+                self._reconnect.record('disconnected' if connected.is_set() else 'failed', e)
+            finally:
+                if holding:
+                    slot.release()
 
             self._ws = None
+            self._sender.stop()
+            if self._resync_task:
+                self._resync_task.cancel()
+                self._resync_task = None
+            self._ramps.cancel_all()
+            self.fail_pending(ConnectionError('Connection to device lost'))
 
             # notify disconnection
             if connected.is_set():
@@ -545,19 +1723,211 @@ class TagoDevice(TagoBase):
             self.update()
 
             if self._running:
-                await asyncio.sleep(3)
+                delay = self._reconnect.next_delay()
+                logging.debug("reconnecting to %s in %.2fs", self.uri, delay)
+                if delay:
+                    try:
+                        await asyncio.wait_for(self._stop_flag.wait(), delay)
+                    except TimeoutError:
+                        pass
+
+    async def apply_scene(self, targets: dict[str, float | dict], duration: float = None, force: bool = False) -> None:
+        """Set many lights at once, each target is a brightness or a dict of brightness, ct and colour.
+
+        Targets from calls made within SCENE_WINDOW of each other go out together, as a single
+        set_lights frame when the controller supports it or else as a back to back burst.
+        """
+        added = False
+        for eid, target in targets.items():
+            light = self._index.get(eid)
+            if not isinstance(light, TagoLight):
+                logging.debug("scene target %s is not a light", eid)
+                continue
+            data, predict = light.scene_command(target, duration)
+            batched = self._scene_batch.get(eid)
+            if batched is not None:
+                # a batched command not sent yet is updated, whatever the light's state
+                data = TagoMessage.merge_data(batched[1], data)
+                predict = light._prediction_for(data)
+            elif light.suppress(predict, force):
+                continue
+            self._scene_batch[eid] = (light, data, predict, light._transition(data))
+            added = True
+
+        if not added:
+            return
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._scene_waiters.append(waiter)
+        if self._scene_handle is None:
+            self._scene_handle = loop.call_later(self.SCENE_WINDOW, self._flush_scene)
+        await waiter
+
+    def _flush_scene(self) -> None:
+        self._scene_handle = None
+        commands = list(self._scene_batch.values())
+        waiters = self._scene_waiters
+        self._scene_batch = dict()
+        self._scene_waiters = list()
+
+        def done(task: asyncio.Task) -> None:
+            for waiter in waiters:
+                if waiter.done():
+                    continue
+                if task.cancelled():
+                    waiter.cancel()
+                elif task.exception() is not None:
+                    waiter.set_exception(task.exception())
+                else:
+                    waiter.set_result(None)
+
+        asyncio.create_task(self._send_scene(commands)).add_done_callback(done)
+
+    async def _send_scene(self, commands: list[tuple[TagoLight, dict, dict, float]]) -> None:
+        if len(commands) > 1 and self.FEATURE_MULTI_LOAD in self._features:
+            predicted = [light for light, _, predict, duration in commands if light.command_started(predict, duration)]
+            loads = [{TagoDevice.PROP_ID: light.unique_id, **data} for light, data, _, _ in commands]
+            try:
+                await self.send_request(req=TagoDevice.REQ_SET_LIGHTS, dst=self._eid, data={TagoDevice.PROP_LOADS: loads})
+            except BaseException:
+                for light in predicted:
+                    light.rollback()
+                raise
+            return
+
+        # queued back to back, so the fades start together
+        await asyncio.gather(*(
+            light.send_request(req=TagoLight.REQ_SET_LIGHT, data=data, coalesce=True, predict=predict, duration=duration, force=True)
+            for light, data, predict, duration in commands))
 
     async def reboot(self):
         if self.is_connected == False:
             return
 
-        await self.send_request(req=TagoDevice.REQ_DEVICE_REBOOT, dst=self._eid)
+        await self.send_request(req=TagoDevice.REQ_DEVICE_REBOOT, dst=self._eid, priority=TagoSendQueue.PRIORITY_DIAGNOSTIC)
 
     async def identify(self):
         if self.is_connected == False:
             return
 
-        await self.send_request(req=TagoDevice.REQ_DEVICE_IDENTIFY, dst=self._eid)
+        await self.send_request(req=TagoDevice.REQ_DEVICE_IDENTIFY, dst=self._eid, priority=TagoSendQueue.PRIORITY_DIAGNOSTIC)
+
+
+class TagoManager:
+    """Owns every TagoDevice of an installation.
+
+    Connects are made concurrently but at most ``max_concurrent`` devices open
+    a connection at a time, also when reconnecting. SSL contexts are built once
+    per CA on a single executor and shared by all devices.
+    """
+    MAX_CONCURRENT_CONNECTS = 16
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_CONNECTS, executor: Executor = None):
+        self._devices: dict[str, TagoDevice] = dict()
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._max_concurrent = max_concurrent
+        self._executor = executor
+        self._ssl_contexts: dict[str, asyncio.Future] = dict()
+        self._startup_started: float = None
+        self._startup_duration: float = None
+        self._never_connected: set[str] = set()
+
+    @property
+    def connect_slot(self) -> asyncio.Semaphore:
+        return self._slots
+
+    @property
+    def devices(self) -> dict[str, TagoDevice]:
+        return self._devices
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def get(self, key: str) -> TagoDevice | None:
+        return self._devices.get(key)
+
+    @property
+    def startup_duration(self) -> float | None:
+        """Seconds from the first device being added until every device had connected once"""
+        return self._startup_duration
+
+    def add(self, key: str, device: TagoDevice) -> TagoDevice:
+        if self._startup_started is None:
+            self._startup_started = time.monotonic()
+        device._manager = self
+        self._devices[key] = device
+        self._never_connected.add(key)
+        return device
+
+    def remove(self, key: str) -> TagoDevice | None:
+        device = self._devices.pop(key, None)
+        if device is not None:
+            device._manager = None
+        self._never_connected.discard(key)
+        return device
+
+    def device_connected(self, device: TagoDevice) -> None:
+        if not self._never_connected:
+            return
+        for key, known in self._devices.items():
+            if known is device:
+                self._never_connected.discard(key)
+        if not self._never_connected and self._startup_duration is None:
+            self._startup_duration = time.monotonic() - self._startup_started
+            logging.debug("all %d devices connected in %.3fs", len(self._devices), self._startup_duration)
+
+    async def run_in_executor(self, func: Callable, *args):
+        """Run blocking work on the executor shared by all devices"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def get_ssl_context(self, ca: str = None) -> ssl.SSLContext:
+        context = self._ssl_contexts.get(ca)
+        if context is None:
+            # concurrent callers wait on the same build
+            context = self._ssl_contexts[ca] = asyncio.ensure_future(
+                self.run_in_executor(TagoDevice.create_ssl_context, ca))
+        return await asyncio.shield(context)
+
+    async def connect(self, key: str, timeout: float | None = None) -> None:
+        await self._devices[key].connect(timeout=timeout)
+
+    async def disconnect_all(self, timeout: float | None = None) -> None:
+        """Disconnect every device concurrently, errors are ignored"""
+        await asyncio.gather(
+            *(device.disconnect(timeout) for device in self._devices.values() if device._task is not None),
+            return_exceptions=True)
+
+    def health(self) -> dict:
+        """Connection health of the whole fleet and of each device"""
+        devices = dict()
+        durations = list()
+        for key, device in self._devices.items():
+            attempts = device.reconnect_policy.attempts
+            errors = [a for a in attempts if a['error'] is not None]
+            if device.connect_duration is not None:
+                durations.append(device.connect_duration)
+            devices[key] = {
+                'host': device._hoststr,
+                'serial_num': device.serial_num,
+                'connected': device.is_connected,
+                'connect_duration': device.connect_duration,
+                'resync_duration': device.resync_duration,
+                'failures': device.reconnect_policy.failures,
+                'last_error': errors[-1]['error'] if errors else None,
+                'unmatched_frames': device.unmatched_frames,
+            }
+        durations.sort()
+        return {
+            'devices': len(self._devices),
+            'connected': sum(1 for d in devices.values() if d['connected']),
+            'max_concurrent_connects': self._max_concurrent,
+            'startup_duration': self._startup_duration,
+            'waiting_for_first_connect': len(self._never_connected),
+            'connect_duration_p50': durations[len(durations) // 2] if durations else None,
+            'connect_duration_max': durations[-1] if durations else None,
+            'per_device': devices,
+        }
 
 
 class TagoSwitch(TagoEntity):
@@ -573,59 +1943,194 @@ class TagoSwitch(TagoEntity):
         super().__init__(json, device)
         self.state = self.STATE_OFF
 
-    async def turn_on(self):
-        await self.send_request(req=self.REQ_TURN_ON)
+    async def turn_on(self, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
+        return await self.send_request(req=self.REQ_TURN_ON, responseTimeout=responseTimeout, predict={"state": self.STATE_ON}, force=force)
 
-    async def turn_off(self):
-        await self.send_request(req=self.REQ_TURN_OFF)
-
-    def handle_state_change(self, msg: TagoMessage) -> None:
-        data = msg.content
-        self._state = data.get("state", self._state)
-        super().handle_state_change(msg)
+    async def turn_off(self, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
+        return await self.send_request(req=self.REQ_TURN_OFF, responseTimeout=responseTimeout, predict={"state": self.STATE_OFF}, force=force)
 
+    def parse_state_json(self, data: dict) -> None:
+        self.state = data.get("state", self.state)
 
-class Ramp:
-    def __init__(self, start: list[float], end: list[float], duration: int, elapsed: int, update_interval: int, callback: Callable):
-        self.start = start
-        self.end = end
-        self.duration = duration
-        self.elapsed = elapsed
-        self.start_time = round(time.time() * 1000)
-        self.update_interval = update_interval
-        self.cb = callback
-        self.task: asyncio.Task = asyncio.create_task(self.task())
+    def export_state(self) -> dict:
+        return {"state": self.state}
 
-    async def task(self) -> None:
-        while True:
-            try:
-                elapsed = ((round(time.time() * 1000)) -
-                           self.start_time) + self.elapsed
-                # ramp finished?
-                if elapsed > self.duration:
-                    self.cancel()
-                    return
+    def handle_state_change(self, msg: TagoMessage) -> None:
+        self.parse_state_json(msg.content)
+        super().handle_state_change(msg)
 
-                progress = min(elapsed / self.duration, 1.0)
 
-                values = self.start.copy()
-                for i in range(len(values)):
-                    if values[i] is None or self.end[i] is None or self.start[i] is None:
-                        continue
-                    values[i] = self.start[i] + \
-                        (progress * (self.end[i] - self.start[i]))
+class TagoRampEngine:
+    """Animates the active light ramps of a device from one shared tick.
+
+    Ramp parameters are kept in flat ``array`` columns, one slot per light, so
+    that a tick interpolates every active light in one pass (vectorised when
+    NumPy is installed). Missing channels are stored as NaN and masked out.
+    """
+    UPDATE_INTERVAL = 1/8
+    CHANNELS = 4
+    # rounding per channel (brightness, ct, x, y) used to detect visible changes
+    RESOLUTION = (1.0, 1.0, 10000.0, 10000.0)
+    # below this many ramps the per-call NumPy overhead outweighs the gain
+    VECTORISE_THRESHOLD = 32
+
+    def __init__(self, update_interval: float = UPDATE_INTERVAL, vectorised: bool = True):
+        self._update_interval = update_interval
+        self._vectorised = vectorised and np is not None
+        self._lights: list[TagoLight] = list()
+        self._slots: dict[str, int] = dict()
+        self._start = array('d')
+        self._end = array('d')
+        self._last = array('d')
+        self._duration = array('d')
+        self._elapsed = array('d')
+        self._started = array('d')
+        self._task: asyncio.Task = None
 
-                if self.cb:
-                    self.cb(values)
+    def __len__(self) -> int:
+        return len(self._lights)
 
-                await asyncio.sleep(self.update_interval)
+    @property
+    def is_vectorised(self) -> bool:
+        return self._vectorised
+
+    def start(self, light: TagoLight, start: list[float], end: list[float], duration: int, elapsed: int, now: float = None) -> None:
+        if now is None:
+            now = time.monotonic()
+
+        self.cancel(light)
+        self._slots[light.unique_id] = len(self._lights)
+        self._lights.append(light)
+        for column, values in ((self._start, start), (self._end, end)):
+            column.extend(math.nan if values[i] is None else values[i]
+                          for i in range(self.CHANNELS))
+        self._last.extend(math.nan for _ in range(self.CHANNELS))
+        self._duration.append(duration)
+        self._elapsed.append(elapsed)
+        self._started.append(now)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.task())
+
+    def cancel(self, light: TagoLight) -> None:
+        slot = self._slots.pop(light.unique_id, None)
+        if slot is not None:
+            self._remove(slot)
+
+    def cancel_all(self) -> None:
+        self._lights.clear()
+        self._slots.clear()
+        for column in (self._start, self._end, self._last, self._duration, self._elapsed, self._started):
+            del column[:]
+
+    def is_active(self, light: TagoLight) -> bool:
+        return light.unique_id in self._slots
+
+    def _remove(self, slot: int) -> None:
+        """Drop a slot by moving the last slot into its place"""
+        last = len(self._lights) - 1
+        c = self.CHANNELS
+        if slot != last:
+            moved = self._lights[last]
+            self._lights[slot] = moved
+            self._slots[moved.unique_id] = slot
+            for column in (self._start, self._end, self._last):
+                column[slot * c:(slot + 1) * c] = column[last * c:]
+            for column in (self._duration, self._elapsed, self._started):
+                column[slot] = column[last]
+
+        self._lights.pop()
+        for column in (self._start, self._end, self._last):
+            del column[last * c:]
+        for column in (self._duration, self._elapsed, self._started):
+            del column[last]
+
+    def advance(self, now: float) -> tuple[list[tuple[TagoLight, list[float]]], list[int]]:
+        """Interpolate all ramps at ``now``.
+
+        Returns the lights whose rounded value changed along with their new
+        values, and the slots of the ramps that have finished.
+        """
+        if not self._lights:
+            return list(), list()
+        if self._vectorised and len(self._lights) >= self.VECTORISE_THRESHOLD:
+            return self._advance_vectorised(now)
+        return self._advance_sequential(now)
+
+    def _advance_vectorised(self, now: float) -> tuple[list[tuple[TagoLight, list[float]]], list[int]]:
+        n = len(self._lights)
+        start = np.frombuffer(self._start, dtype=np.float64).reshape(n, self.CHANNELS)
+        end = np.frombuffer(self._end, dtype=np.float64).reshape(n, self.CHANNELS)
+        last = np.frombuffer(self._last, dtype=np.float64).reshape(n, self.CHANNELS)
+        duration = np.frombuffer(self._duration, dtype=np.float64)
+        elapsed = np.frombuffer(self._elapsed, dtype=np.float64) + \
+            (now - np.frombuffer(self._started, dtype=np.float64)) * 1000
+
+        finished = elapsed >= duration
+        with np.errstate(divide='ignore', invalid='ignore'):
+            progress = np.where(finished, 1.0, elapsed / duration)
+
+        values = start + progress[:, None] * (end - start)
+        valid = ~np.isnan(values)
+        rounded = np.round(values * self.RESOLUTION)
+        changed = np.any(valid & (rounded != last), axis=1) | finished
+        np.copyto(last, rounded, where=valid)
+
+        rows = np.flatnonzero(changed).tolist()
+        updates = [(self._lights[row], [None if v != v else v for v in row_values])
+                   for row, row_values in zip(rows, values[rows].tolist())]
+        return updates, np.flatnonzero(finished).tolist()
+
+    def _advance_sequential(self, now: float) -> tuple[list[tuple[TagoLight, list[float]]], list[int]]:
+        c = self.CHANNELS
+        updates = list()
+        finished = list()
+        for slot in range(len(self._lights)):
+            duration = self._duration[slot]
+            elapsed = self._elapsed[slot] + (now - self._started[slot]) * 1000
+            done = elapsed >= duration
+            progress = 1.0 if done else elapsed / duration
+
+            changed = done
+            values = [None] * c
+            for i in range(c):
+                a = self._start[slot * c + i]
+                b = self._end[slot * c + i]
+                if a != a or b != b:
+                    continue
+                values[i] = a + (progress * (b - a))
+                rounded = round(values[i] * self.RESOLUTION[i])
+                if rounded != self._last[slot * c + i]:
+                    self._last[slot * c + i] = rounded
+                    changed = True
+
+            if changed:
+                updates.append((self._lights[slot], values))
+            if done:
+                finished.append(slot)
+
+        return updates, finished
+
+    def tick(self, now: float = None) -> None:
+        """Advance every active ramp, retiring the ones that have run out"""
+        if now is None:
+            now = time.monotonic()
+
+        updates, finished = self.advance(now)
+        for slot in sorted(finished, reverse=True):
+            del self._slots[self._lights[slot].unique_id]
+            self._remove(slot)
+
+        for light, values in updates:
+            try:
+                light.ramp_update(values)
             except Exception as e:
                 logging.exception(e)
 
-    def cancel(self):
-        if self.task:
-            self.cb = None
-            self.task.cancel()
+    async def task(self) -> None:
+        while self._lights:
+            self.tick()
+            await asyncio.sleep(self._update_interval)
 
 
 class TagoLight(TagoEntity):
@@ -653,6 +2158,8 @@ class TagoLight(TagoEntity):
     PROP_END = "end"
     PROP_FAULT = "fault"
     PROP_EFFECT = "effect"
+    # scene target key of an (x, y) colour pair
+    PROP_COLOUR = "colour"
     VALUE_FLASH = "flash"
     REQ_SET_LIGHT = "set_light"
     REQ_STOP_RAMP = "stop_ramp"
@@ -661,6 +2168,9 @@ class TagoLight(TagoEntity):
     types = [LIGHT_ONOFF, LIGHT_DIMMABLE, LIGHT_MONO, LIGHT_RGB,
              LIGHT_RGBW, LIGHT_RGB_CCT, LIGHT_CCT]
 
+    # channels in the order the ramp engine animates them
+    RAMP_PROPS = (PROP_BRIGHTNESS, PROP_CT, PROP_X, PROP_Y)
+
     CT_MIN = 1400
     CT_MAX = 10000
 
@@ -672,7 +2182,6 @@ class TagoLight(TagoEntity):
         self._ct: float = 0.0
         self._ct_range_min: int = TagoLight.CT_MIN
         self._ct_range_max: int = TagoLight.CT_MAX
-        self._ramp: Ramp = None
         self.parse_state_json(json)
 
     def _brightness_param_parse(self, brightness: float, duration: float = None, rate: float = None) -> dict:
@@ -688,33 +2197,64 @@ class TagoLight(TagoEntity):
 
         return data
 
-    async def set_light_flash(self, duration: int) -> None:
+    async def set_light_flash(self, duration: int, responseTimeout: float = None) -> None | TagoMessage:
         """Flash all channels for a specified duration"""
-        await self.send_request(req=self.REQ_LIGHT_EFFECT, data={self.PROP_EFFECT: self.VALUE_FLASH, self.PROP_DURATION: duration})
-
-    async def set_brightness(self, brightness: float, duration: float = None, rate: float = None) -> None:
+        return await self.send_request(req=self.REQ_LIGHT_EFFECT, data={self.PROP_EFFECT: self.VALUE_FLASH, self.PROP_DURATION: duration}, responseTimeout=responseTimeout)
+
+    def _transition(self, data: dict) -> float | None:
+        """Seconds the device will take to reach the brightness in ``data``"""
+        if self.PROP_DURATION in data:
+            return data[self.PROP_DURATION] / 1000
+        if self.PROP_RATE in data and self.PROP_BRIGHTNESS in data:
+            return abs(data[self.PROP_BRIGHTNESS] - self._brightness) / self.MAX_VALUE * data[self.PROP_RATE] / 1000
+        return None
+
+    def _prediction_for(self, data: dict) -> dict:
+        return {key: data[key] for key in self.RAMP_PROPS if key in data}
+
+    def scene_command(self, target: float | dict, duration: float = None) -> tuple[dict, dict]:
+        """set_light data and predicted state for a scene target, see TagoDevice.apply_scene"""
+        if not isinstance(target, dict):
+            target = {self.PROP_BRIGHTNESS: target}
+
+        data = self._brightness_param_parse(target.get(self.PROP_BRIGHTNESS), duration)
+        if target.get(self.PROP_CT) is not None:
+            data[self.PROP_CT] = self.convert_value_from_float(target[self.PROP_CT])
+        colour = target.get(self.PROP_COLOUR)
+        if colour is not None:
+            data[self.PROP_X] = colour[0]
+            data[self.PROP_Y] = colour[1]
+        return data, self._prediction_for(data)
+
+    async def set_brightness(self, brightness: float, duration: float = None, rate: float = None, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
         """Set brightness to specified value between 0.0 and 1.0"""
         if brightness is None:
             raise ValueError('Brightness must be specified')
 
         data = self._brightness_param_parse(brightness, duration, rate)
-        await self.send_request(req=self.REQ_SET_LIGHT, data=data)
+        return await self.send_request(req=self.REQ_SET_LIGHT, data=data, responseTimeout=responseTimeout, coalesce=True,
+                                       predict=self._prediction_for(data), duration=self._transition(data), force=force)
 
-    async def adjust_brightness(self, brightness: float, duration: float = None, rate: float = None) -> None:
+    async def adjust_brightness(self, brightness: float, duration: float = None, rate: float = None, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
         """Adjust brightness up or down between -1.0 and 1.0"""
-        data = self._brightness_param_parse(brightness, duration, rate)
-        await self.send_request(req=self.REQ_SET_LIGHT, data=data)
-
-    async def set_ct(self, ct: float,  brightness: float = None, duration: float = None, rate: float = None) -> None:
+        data = self._brightness_param_parse(None, duration, rate)
+        data[self.PROP_BRIGHTNESS_PLUS] = self.convert_value_from_float(brightness)
+        target = max(0, min(self.MAX_VALUE, self._brightness + data[self.PROP_BRIGHTNESS_PLUS]))
+        return await self.send_request(req=self.REQ_SET_LIGHT, data=data, responseTimeout=responseTimeout,
+                                       predict={self.PROP_BRIGHTNESS: target},
+                                       duration=self._transition({**data, self.PROP_BRIGHTNESS: target}), force=force)
+
+    async def set_ct(self, ct: float,  brightness: float = None, duration: float = None, rate: float = None, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
         """Set colour temperature ratio and (optional) brightness to be between 0.0 and 1.0"""
         if ct is None:
             raise ValueError('Colour Temperature must be specified')
 
         data = self._brightness_param_parse(brightness, duration, rate)
         data[self.PROP_CT] = self.convert_value_from_float(ct)
-        await self.send_request(req=self.REQ_SET_LIGHT, data=data)
+        return await self.send_request(req=self.REQ_SET_LIGHT, data=data, responseTimeout=responseTimeout, coalesce=True,
+                                       predict=self._prediction_for(data), duration=self._transition(data), force=force)
 
-    async def set_colour(self, colour: tuple[float, float],  brightness: float = None, duration: float = None) -> None:
+    async def set_colour(self, colour: tuple[float, float],  brightness: float = None, duration: float = None, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
         """Set colour XY points and (optional) brightness to be between 0.0 and 1.0"""
         if colour is None or len(colour) < 2:
             raise ValueError('Colour XY pair must be specified')
@@ -722,11 +2262,12 @@ class TagoLight(TagoEntity):
         data = self._brightness_param_parse(brightness, duration)
         data[self.PROP_X] = colour[0]
         data[self.PROP_Y] = colour[1]
-        await self.send_request(req=self.REQ_SET_LIGHT, data=data)
+        return await self.send_request(req=self.REQ_SET_LIGHT, data=data, responseTimeout=responseTimeout, coalesce=True,
+                                       predict=self._prediction_for(data), duration=self._transition(data), force=force)
 
-    async def stop_ramp(self):
+    async def stop_ramp(self, responseTimeout: float = None) -> None | TagoMessage:
         """Stop any active ramps"""
-        await self.send_request(req=self.REQ_STOP_RAMP)
+        return await self.send_request(req=self.REQ_STOP_RAMP, responseTimeout=responseTimeout)
 
     @property
     def brightness(self) -> int:
@@ -746,7 +2287,7 @@ class TagoLight(TagoEntity):
 
     @property
     def is_ramp_active(self) -> bool:
-        return self._ramp is not None
+        return self._device.ramps.is_active(self)
 
     def ramp_update(self, values):
         if values[0] is not None:
@@ -760,6 +2301,31 @@ class TagoLight(TagoEntity):
 
         self.update()
 
+    def apply_config(self, json: dict) -> bool:
+        self.parse_state_json(json)
+        return super().apply_config(json)
+
+    def apply_prediction(self, state: dict, duration: float = None) -> None:
+        # a predicted transition is animated locally until the device reports its own ramp
+        self._device.ramps.cancel(self)
+        end = [state.get(key) for key in self.RAMP_PROPS]
+        if duration:
+            current = self.export_state()
+            start = [current[key] if value is not None else None for key, value in zip(self.RAMP_PROPS, end)]
+            self._device.ramps.start(self, start, end, int(duration * 1000), 0)
+        else:
+            self.ramp_update(end)
+
+    def reported_state(self, data: dict) -> dict:
+        ramp: dict = data.get(self.PROP_RAMP)
+        if ramp:
+            return {**data, **ramp.get(self.PROP_END, dict())}
+        return data
+
+    def retire(self) -> None:
+        self._device.ramps.cancel(self)
+        super().retire()
+
     def parse_state_json(self, data: dict) -> None:
         self._brightness = data.get(self.PROP_BRIGHTNESS, self._brightness)
         self._ct = data.get(self.PROP_CT, self._ct)
@@ -776,13 +2342,19 @@ class TagoLight(TagoEntity):
         else:
             self._fault = list()
 
+    def export_state(self) -> dict:
+        return {
+            self.PROP_BRIGHTNESS: self._brightness,
+            self.PROP_CT: self._ct,
+            self.PROP_X: self._colour_x,
+            self.PROP_Y: self._colour_y,
+        }
+
     def handle_state_change(self, msg: TagoMessage) -> None:
         data = msg.content
 
         # cancel any running ramps
-        if self._ramp:
-            self._ramp.cancel()
-            self._ramp = None
+        self._device.ramps.cancel(self)
 
         self.parse_state_json(msg.content)
 
@@ -799,19 +2371,15 @@ class TagoLight(TagoEntity):
                 values = list()
                 for i in range(len(map)):
                     key = map[i]
-                    value = collection.get(key)
-                    if value:
-                        values.append(value)
-                    else:
-                        values.append(None)
+                    values.append(collection.get(key))
                 return values
 
             props = [self.PROP_BRIGHTNESS,
                      self.PROP_CT, self.PROP_X, self.PROP_Y]
             start_values = get_values(start, props)
             end_values = get_values(end, props)
-            self._ramp = Ramp(start_values, end_values,
-                              duration, elapsed, 1/8, self.ramp_update)
+            self._device.ramps.start(
+                self, start_values, end_values, duration, elapsed)
 
         super().handle_state_change(msg)
 
@@ -830,22 +2398,38 @@ class TagoCover(TagoEntity):
 
     REQ_STOP = "stop_move"
     REQ_MOVE_TO = "move_to"
+    # positions run from open to closed
+    OPEN = 0
+    CLOSED = 100
 
     def __init__(self, json: dict, device: TagoDevice):
         super().__init__(json, device)
         self._position = 0
         self._target = 0
 
-    async def move_to(self, target: int):
-        await self.send_request(req=self.REQ_MOVE_TO, target=target)
+    async def move_to(self, target: int, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
+        return await self.send_request(req=self.REQ_MOVE_TO, data={"target": target}, responseTimeout=responseTimeout, predict={"target": target}, force=force)
 
-    async def stop_move(self):
-        await self.send_request(req=self.REQ_STOP)
+    async def stop_move(self, responseTimeout: float = None) -> None | TagoMessage:
+        return await self.send_request(req=self.REQ_STOP, responseTimeout=responseTimeout)
 
-    def handle_state_change(self, msg: TagoMessage) -> None:
-        data = msg.content
+    @property
+    def position(self) -> int:
+        return self._position
+
+    @property
+    def target(self) -> int:
+        return self._target
+
+    def parse_state_json(self, data: dict) -> None:
         self._position = data.get("position", self._position)
         self._target = data.get("target", self._target)
+
+    def export_state(self) -> dict:
+        return {"position": self._position, "target": self._target}
+
+    def handle_state_change(self, msg: TagoMessage) -> None:
+        self.parse_state_json(msg.content)
         super().handle_state_change(msg)
 
 
@@ -864,28 +2448,33 @@ class TagoFan(TagoEntity):
         self._value = 0
         self.state = self.STATE_OFF
 
-    async def turn_on(self):
-        await self.send_request(req=self.REQ_TURN_ON)
+    async def turn_on(self, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
+        return await self.send_request(req=self.REQ_TURN_ON, responseTimeout=responseTimeout, predict={'is_on': True}, force=force)
 
-    async def turn_off(self):
-        await self.send_request(req=self.REQ_TURN_OFF)
+    async def turn_off(self, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
+        return await self.send_request(req=self.REQ_TURN_OFF, responseTimeout=responseTimeout, predict={'is_on': False}, force=force)
 
-    async def set_speed(self, percentage: int):
+    async def set_speed(self, percentage: int, responseTimeout: float = None, force: bool = False) -> None | TagoMessage:
         if percentage == 0:
-            await self.turn_off()
-            return
+            return await self.turn_off(responseTimeout=responseTimeout, force=force)
 
-        level = math.ceil(percentage_to_ranged_value(
-            self.MAX_VALUE, percentage))
-        await self.send_request(req=self.REQ_SET_FAN, data={"value": [level]})
+        level = math.ceil((self.MAX_VALUE * percentage) / 100)
+        return await self.send_request(req=self.REQ_SET_FAN, data={"value": [level]}, responseTimeout=responseTimeout, predict={'value': level, 'is_on': True}, force=force)
 
-    def handle_state_change(self, msg: TagoMessage) -> None:
-        data = msg.content
-        
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def parse_state_json(self, data: dict) -> None:
         self._value = data.get('value', data.get('brightness', self._value))
-        if data.get('is_on', self._value > 0):            
+        if data.get('is_on', self._value > 0):
             self.state = self.STATE_ON
         else:
             self.state = self.STATE_OFF
-            
+
+    def export_state(self) -> dict:
+        return {'value': self._value, 'is_on': self.state == self.STATE_ON}
+
+    def handle_state_change(self, msg: TagoMessage) -> None:
+        self.parse_state_json(msg.content)
         super().handle_state_change(msg)
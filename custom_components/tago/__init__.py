@@ -3,18 +3,37 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import Event, HomeAssistant, ServiceCall
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.device_registry import async_get as async_get_device_registry
+from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.storage import Store
 
-from .const import CONF_AUTHKEY, CONF_HOSTSTR, DOMAIN
-from .TagoNet import TagoDevice, TagoEntity
+from .const import (ATTR_ENABLED, ATTR_SIZE, CACHE_SAVE_DELAY, CACHE_VERSION, CONF_AUTHKEY, CONF_BINDINGS,
+                    CONF_CONTROLLER, CONF_HOSTSTR, CONF_OPTIMISTIC, CONF_SEND_RATE, CONF_SEND_WINDOW,
+                    DATA_BINDINGS, DATA_MANAGER,
+                    DATA_OPTIMISTIC, DOMAIN, SERVICE_SET_TRACE,
+                    SETUP_CONNECT_TIMEOUT, SHUTDOWN_DISCONNECT_TIMEOUT)
+from .events import InputEventRelay
+from .TagoNet import (TagoBinding, TagoCover, TagoDevice, TagoEntity, TagoFan, TagoLight, TagoManager,
+                      TagoSendQueue, TagoSwitch, TagoTraceBuffer)
 
-PLATFORMS: list[str] = [Platform.LIGHT, Platform.FAN,
-                        Platform.SWITCH, Platform.COVER, Platform.BUTTON, Platform.SENSOR]
+# platforms set up for every controller, the others only when it has loads of their kind
+DEVICE_PLATFORMS: list[str] = [Platform.BUTTON, Platform.SENSOR]
+LOAD_PLATFORMS: dict[type[TagoEntity], str] = {
+    TagoLight: Platform.LIGHT,
+    TagoFan: Platform.FAN,
+    TagoSwitch: Platform.SWITCH,
+    TagoCover: Platform.COVER,
+}
 
 def generate_device_info(device: TagoDevice) -> DeviceInfo:
     return DeviceInfo(
@@ -29,9 +48,138 @@ def generate_device_info(device: TagoDevice) -> DeviceInfo:
 
 task = None
 
+LEVEL = vol.All(vol.Coerce(float), vol.Range(min=0.0, max=1.0))
+
+
+def _binding_loads(binding: dict) -> dict:
+    """A scene binding sets levels, every other action needs targets"""
+    if binding[TagoBinding.PROP_ACTION] == TagoBinding.ACTION_SCENE:
+        if not binding.get(TagoBinding.PROP_LEVELS):
+            raise vol.Invalid("a scene binding needs levels")
+    elif not binding.get(TagoBinding.PROP_TARGETS):
+        raise vol.Invalid(f"a {binding[TagoBinding.PROP_ACTION]} binding needs targets")
+    return binding
+
+
+# keypad input -> load action, run by the controller connection without the automation engine
+BINDING_SCHEMA = vol.All(vol.Schema(
+    {
+        vol.Optional(CONF_CONTROLLER): cv.string,
+        vol.Required(TagoBinding.PROP_KEYPAD): vol.Any(int, str),
+        vol.Optional(TagoBinding.PROP_KEY): vol.Any(int, str),
+        vol.Optional(TagoBinding.PROP_EVENT, default=TagoBinding.DEFAULT_EVENT): cv.string,
+        vol.Required(TagoBinding.PROP_ACTION): vol.In(TagoBinding.ACTIONS),
+        vol.Optional(TagoBinding.PROP_TARGETS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(TagoBinding.PROP_LEVEL): LEVEL,
+        vol.Optional(TagoBinding.PROP_STEP): LEVEL,
+        vol.Optional(TagoBinding.PROP_DURATION): vol.All(vol.Coerce(float), vol.Range(min=0.0)),
+        vol.Optional(TagoBinding.PROP_LEVELS): {cv.string: LEVEL},
+    }
+), _binding_loads)
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema(
+            {
+                vol.Optional(CONF_BINDINGS, default=[]): [BINDING_SCHEMA],
+                # show commanded states before the controller confirms them
+                vol.Optional(CONF_OPTIMISTIC, default=False): cv.boolean,
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+SET_TRACE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENABLED): cv.boolean,
+        vol.Optional(ATTR_SIZE): vol.All(vol.Coerce(int), vol.Range(min=100, max=100000)),
+    }
+)
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Keep the keypad bindings and optimistic mode, and register the integration wide services."""
+    domain_config = config.get(DOMAIN, {})
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    domain_data[DATA_BINDINGS] = domain_config.get(CONF_BINDINGS, [])
+    domain_data[DATA_OPTIMISTIC] = domain_config.get(CONF_OPTIMISTIC, False)
+
+    async def set_trace(call: ServiceCall) -> None:
+        enabled = call.data[ATTR_ENABLED]
+        size = call.data.get(ATTR_SIZE)
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            if entry.state is not ConfigEntryState.LOADED:
+                continue
+            device: TagoDevice = entry.runtime_data
+            if not enabled or size is not None:
+                device.disable_trace()
+            if enabled:
+                device.enable_trace(size or TagoTraceBuffer.SIZE)
+
+    hass.services.async_register(DOMAIN, SERVICE_SET_TRACE, set_trace, schema=SET_TRACE_SCHEMA)
+    return True
+
+
+def get_manager(hass: HomeAssistant) -> TagoManager:
+    """The manager owning the devices of every config entry"""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    manager = domain_data.get(DATA_MANAGER)
+    if manager is None:
+        # blocking work runs on the shared Home Assistant executor
+        manager = domain_data[DATA_MANAGER] = TagoManager()
+
+        async def disconnect_all(event: Event) -> None:
+            # entries are not unloaded on shutdown, close every connection together
+            await manager.disconnect_all(timeout=SHUTDOWN_DISCONNECT_TIMEOUT)
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, disconnect_all)
+    return manager
+
+
+def platforms_for(device: TagoDevice) -> list[str]:
+    """Platforms with at least one entity for the device"""
+    platforms = list(DEVICE_PLATFORMS)
+    for e in device.entities:
+        platform = LOAD_PLATFORMS.get(type(e))
+        if platform is not None and platform not in platforms:
+            platforms.append(platform)
+    return platforms
+
+
+def bindings_for(hass: HomeAssistant, device: TagoDevice) -> list[dict]:
+    """The configured bindings of a controller with entity ids replaced by load ids"""
+    entity_registry = async_get_entity_registry(hass)
+
+    def load_id(target: str) -> str:
+        if '.' not in target:
+            return target
+        registry_entry = entity_registry.async_get(target)
+        if registry_entry is None or registry_entry.platform != DOMAIN:
+            logging.warning("Keypad binding target %s is not a Tago entity", target)
+            return target
+        return registry_entry.unique_id
+
+    bindings = list()
+    for binding in hass.data[DOMAIN].get(DATA_BINDINGS, []):
+        if binding.get(CONF_CONTROLLER, device.unique_id) != device.unique_id:
+            continue
+        binding = {k: v for k, v in binding.items() if k != CONF_CONTROLLER}
+        if TagoBinding.PROP_TARGETS in binding:
+            binding[TagoBinding.PROP_TARGETS] = [load_id(t) for t in binding[TagoBinding.PROP_TARGETS]]
+        if TagoBinding.PROP_LEVELS in binding:
+            binding[TagoBinding.PROP_LEVELS] = {load_id(t): v for t, v in binding[TagoBinding.PROP_LEVELS].items()}
+        bindings.append(binding)
+    return bindings
+
+
+def get_cache_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Per-entry store holding the last known node list and entity states"""
+    return Store(hass, CACHE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:    
-    hass.data.setdefault(DOMAIN, {})
+    manager = get_manager(hass)
     hoststr = entry.data.get(CONF_HOSTSTR) or ''
     authkey = entry.data.get(CONF_AUTHKEY) or ''
 
@@ -39,8 +187,60 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     entry_data = hass.data[DOMAIN].setdefault(entry.entry_id, {})
 
-    device = TagoDevice(hoststr, authkey)
-    await device.connect()
+    started = time.monotonic()
+    store = get_cache_store(hass, entry)
+    cache = await store.async_load()
+
+    device = manager.add(entry.entry_id, TagoDevice(
+        hoststr, authkey, window=entry.options.get(CONF_SEND_WINDOW, TagoSendQueue.WINDOW),
+        rate=entry.options.get(CONF_SEND_RATE) or None))
+    device.optimistic = hass.data[DOMAIN].get(DATA_OPTIMISTIC, False)
+    if cache:
+        # entities come up from the cache, live state follows once connected
+        device.restore(cache)
+        _, autherror = device.start()
+
+        async def watch_auth() -> None:
+            # setup has returned by the time the key is refused, ask for a new one
+            await autherror.wait()
+            logging.error("Authentication with %s failed", hoststr)
+            entry.async_start_reauth(hass)
+
+        entry.async_create_background_task(hass, watch_auth(), f"{DOMAIN} {entry.entry_id} auth")
+    else:
+        # nothing known about the controller yet, give it a bounded time to list its nodes
+        try:
+            await manager.connect(entry.entry_id, timeout=SETUP_CONNECT_TIMEOUT)
+        except BaseException as e:
+            manager.remove(entry.entry_id)
+            hass.data[DOMAIN].pop(entry.entry_id)
+            if isinstance(e, TimeoutError):
+                raise ConfigEntryNotReady(f"Timed out connecting to {hoststr}") from e
+            if isinstance(e, PermissionError):
+                raise ConfigEntryAuthFailed(f"Authentication with {hoststr} failed") from e
+            raise
+
+    def save_cache() -> None:
+        store.async_delay_save(device.snapshot, CACHE_SAVE_DELAY)
+
+    # input events go straight from the receive loop to the bus, under the controller's device
+    controller = device_registry.async_get_or_create(
+        config_entry_id=entry.entry_id, **generate_device_info(device))
+    relay = entry_data['events'] = InputEventRelay(hass, device, controller.id, save_cache)
+    device.set_on_input_event(relay)
+
+    device.set_on_resync_complete(save_cache)
+    entry_data['store'] = store
+    platforms = entry_data['platforms'] = platforms_for(device)
+
+    def on_topology_changed(summary: dict) -> None:
+        # added loads need entities and retired ones (also on a type change) lose theirs,
+        # the reload starts from the new topology, saved on unload
+        if summary['added'] or summary['removed']:
+            logging.debug("Reloading entry %s for its new topology", entry.entry_id)
+            hass.config_entries.async_schedule_reload(entry.entry_id)
+
+    device.set_on_topology_changed(on_topology_changed)
 
     entry.runtime_data = device
     for e in device.entities:
@@ -55,20 +255,40 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 pass
 
     await hass.config_entries.async_forward_entry_setups(
-        entry, PLATFORMS
+        entry, list(platforms)
     )
+    # changed send options apply to a new connection
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    # entity id targets resolve once the platforms have registered their entities
+    device.set_bindings(bindings_for(hass, device))
 
+    entry_data['setup_time'] = time.monotonic() - started
+    logging.debug("Set up entry %s in %.3fs (%s)", entry.entry_id,
+                  entry_data['setup_time'], 'cached' if cache else 'uncached')
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     device : TagoDevice = entry.runtime_data
+    await hass.data[DOMAIN][entry.entry_id]['store'].async_save(device.snapshot())
     await device.disconnect()
+    get_manager(hass).remove(entry.entry_id)
 
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    unload_ok = await hass.config_entries.async_unload_platforms(
+        entry, hass.data[DOMAIN][entry.entry_id]['platforms'])
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
         logging.debug("Unloaded entry for %s", entry.entry_id)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop the cached topology of a removed entry."""
+    await get_cache_store(hass, entry).async_remove()
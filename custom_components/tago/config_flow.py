@@ -3,20 +3,24 @@ from __future__ import annotations
 
 import asyncio
 import logging
+from collections.abc import Mapping
 from typing import Any
 from urllib.parse import urlparse
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.components import zeroconf
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .TagoNet import TagoDevice
+from .TagoNet import TagoDevice, TagoSendQueue
 
 from .const import (
     CONF_AUTHKEY,
     CONF_DEVICENAME,
     CONF_HOSTSTR,
+    CONF_SEND_RATE,
+    CONF_SEND_WINDOW,
     DOMAIN,
 )
 
@@ -31,6 +35,13 @@ class TagoConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         self.device_name = None  # Ensure device_name is initialized
         self.hoststr = None  # Store URI for connection testing
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> TagoOptionsFlowHandler:
+        return TagoOptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -140,3 +151,71 @@ class TagoConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 CONF_DEVICENAME: device_id,
                 CONF_HOSTSTR: self.hoststr},
         )
+
+    async def async_step_reauth(
+        self, entry_data: Mapping[str, Any]
+    ) -> FlowResult:
+        """The controller refused the stored authentication key."""
+        self.hoststr = entry_data.get(CONF_HOSTSTR)
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Ask for a new authentication key and check it before reloading the entry."""
+        self.errors = {}
+        if user_input is not None:
+            authkey = user_input.get(CONF_AUTHKEY, '').strip()
+            try:
+                device = TagoDevice(self.hoststr, authkey)
+                await device.connect(timeout=5.0)
+                await device.disconnect(timeout=3.0)
+            except (ConnectionError, asyncio.TimeoutError) as e:
+                logging.debug(f"Connection failed: {str(e)}")
+                self.errors["base"] = "cannot_connect"
+            except PermissionError as e:
+                logging.debug(f"Authentication failed: {str(e)}")
+                self.errors["base"] = "invalid_auth"
+            else:
+                entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+                return self.async_update_reload_and_abort(
+                    entry, data={**entry.data, CONF_AUTHKEY: authkey})
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_AUTHKEY): str,
+                }
+            ),
+            description_placeholders={
+                CONF_HOSTSTR: self.hoststr
+            },
+            errors=self.errors,
+        )
+
+
+class TagoOptionsFlowHandler(config_entries.OptionsFlow):
+    """Send queue limits of one controller, applied by reloading its entry."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry):
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_SEND_WINDOW, default=options.get(CONF_SEND_WINDOW, TagoSendQueue.WINDOW)):
+                        vol.All(vol.Coerce(int), vol.Range(min=1, max=256)),
+                    vol.Optional(CONF_SEND_RATE, default=options.get(CONF_SEND_RATE, 0)):
+                        vol.All(vol.Coerce(float), vol.Range(min=0)),
+                }
+            ),
+        )
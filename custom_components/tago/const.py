@@ -6,3 +6,40 @@ CONF_HOSTSTR = "hostname"
 CONF_AUTHKEY = "authkey"
 CONF_DEVICENAME = "device_name"
 ATTR_RATE = "rate"
+ATTR_ENABLED = "enabled"
+ATTR_SIZE = "size"
+ATTR_KIND = "kind"
+ATTR_ID = "id"
+ATTR_KEY = "key"
+ATTR_EVENT = "event"
+
+CONF_SUBTYPE = "subtype"
+CONF_BINDINGS = "bindings"
+CONF_CONTROLLER = "controller"
+CONF_OPTIMISTIC = "optimistic"
+# per entry options: requests awaiting a reply at once and frames sent per second (0 for no limit)
+CONF_SEND_WINDOW = "send_window"
+CONF_SEND_RATE = "send_rate"
+
+# fired for every keypad, motion and io event of a controller
+EVENT_TAGO = f"{DOMAIN}_event"
+
+SERVICE_SET_TRACE = "set_trace"
+
+CACHE_VERSION = 1
+# seconds to wait before persisting a changed topology/state cache
+CACHE_SAVE_DELAY = 10
+
+# seconds an uncached controller gets to connect before setup is retried later
+SETUP_CONNECT_TIMEOUT = 15
+# seconds every controller gets to close its connection when Home Assistant stops
+SHUTDOWN_DISCONNECT_TIMEOUT = 5
+
+# keys of the TagoManager, configured keypad bindings and optimistic mode in hass.data[DOMAIN]
+DATA_MANAGER = "manager"
+DATA_BINDINGS = "bindings"
+DATA_OPTIMISTIC = "optimistic"
+
+DATA_WRITE_COALESCER = f"{DOMAIN}_write_coalescer"
+# seconds state writes of a ramping light may be held back to batch them
+STATE_WRITE_RAMP_WINDOW = 0.05
@@ -0,0 +1,81 @@
+"""Device triggers for the keypads, motion sensors and inputs of a Tago controller."""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.components.device_automation import DEVICE_TRIGGER_BASE_SCHEMA
+from homeassistant.components.homeassistant.triggers import event as event_trigger
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_DEVICE_ID, CONF_DOMAIN, CONF_PLATFORM, CONF_TYPE
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.trigger import TriggerActionType, TriggerInfo
+from homeassistant.helpers.typing import ConfigType
+
+from .const import CONF_SUBTYPE, DOMAIN, EVENT_TAGO
+from .events import trigger_for
+from .TagoNet import TagoDevice
+
+TRIGGER_SCHEMA = DEVICE_TRIGGER_BASE_SCHEMA.extend(
+    {
+        vol.Required(CONF_TYPE): str,
+        vol.Required(CONF_SUBTYPE): str,
+    }
+)
+
+
+def get_tago_device(hass: HomeAssistant, device_id: str) -> TagoDevice | None:
+    """The loaded controller behind a device registry id, None for loads or unloaded entries"""
+    device_entry = dr.async_get(hass).async_get(device_id)
+    if device_entry is None:
+        return None
+    for entry_id in device_entry.config_entries:
+        entry = hass.config_entries.async_get_entry(entry_id)
+        if entry is None or entry.domain != DOMAIN or entry.state is not ConfigEntryState.LOADED:
+            continue
+        device: TagoDevice = entry.runtime_data
+        if (DOMAIN, device.unique_id) in device_entry.identifiers:
+            return device
+    return None
+
+
+async def async_get_triggers(hass: HomeAssistant, device_id: str) -> list[dict[str, str]]:
+    """List a trigger for every input the controller has reported."""
+    device = get_tago_device(hass, device_id)
+    if device is None:
+        return []
+
+    triggers = []
+    for source in sorted(device.inputs, key=repr):
+        trigger_type, subtype = trigger_for(source)
+        triggers.append({
+            CONF_PLATFORM: "device",
+            CONF_DOMAIN: DOMAIN,
+            CONF_DEVICE_ID: device_id,
+            CONF_TYPE: trigger_type,
+            CONF_SUBTYPE: subtype,
+        })
+    return triggers
+
+
+async def async_attach_trigger(
+    hass: HomeAssistant,
+    config: ConfigType,
+    action: TriggerActionType,
+    trigger_info: TriggerInfo,
+) -> CALLBACK_TYPE:
+    """Listen for the tago_event matching the trigger."""
+    event_config = event_trigger.TRIGGER_SCHEMA(
+        {
+            event_trigger.CONF_PLATFORM: "event",
+            event_trigger.CONF_EVENT_TYPE: EVENT_TAGO,
+            event_trigger.CONF_EVENT_DATA: {
+                CONF_DEVICE_ID: config[CONF_DEVICE_ID],
+                CONF_TYPE: config[CONF_TYPE],
+                CONF_SUBTYPE: config[CONF_SUBTYPE],
+            },
+        }
+    )
+    return await event_trigger.async_attach_trigger(
+        hass, event_config, action, trigger_info, platform_type="device"
+    )
@@ -0,0 +1,43 @@
+"""Diagnostics support for Tago."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_AUTHKEY, DATA_MANAGER, DOMAIN
+from .TagoNet import TagoDevice
+
+TO_REDACT = {CONF_AUTHKEY}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry, including the frame trace when enabled."""
+    device: TagoDevice = entry.runtime_data
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "device": {
+            "serial_num": device.serial_num,
+            "model": device.model_num,
+            "firmware": device.firmware_rev,
+            "connected": device.is_connected,
+            "entities": len(device.entities),
+            "unmatched_frames": device.unmatched_frames,
+            "resync_duration": device.resync_duration,
+            "resync_failures": device.resync_failures,
+        },
+        "send_queue": device.sender.stats(),
+        "latency": device.sender.latency_stats(),
+        "reconnects": device.reconnect_policy.attempts,
+        "inputs": sorted(device.inputs, key=repr),
+        "predictions": device.prediction_stats,
+        "suppressed_commands": device.suppressed_commands,
+        "bindings": sum(len(bindings) for bindings in device.bindings.values()),
+        "event_latency": hass.data[DOMAIN][entry.entry_id]['events'].latency.stats(),
+        "trace": device.trace.dump() if device.trace is not None else None,
+        "fleet": hass.data[DOMAIN][DATA_MANAGER].health(),
+    }
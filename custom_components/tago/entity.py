@@ -1,11 +1,63 @@
+from __future__ import annotations
+
+import asyncio
 import json
 
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import DeviceInfo, Entity
 
-from .const import DOMAIN
+from .const import DATA_WRITE_COALESCER, DOMAIN, STATE_WRITE_RAMP_WINDOW
 from .TagoNet import TagoEntity
 
 
+class StateWriteCoalescer:
+    """Batches state writes so each entity is written at most once per flush.
+
+    Writes are flushed on the next loop iteration, or after ``ramp_window``
+    seconds for entities that are animating a ramp.
+    """
+
+    def __init__(self, hass: HomeAssistant, ramp_window: float = STATE_WRITE_RAMP_WINDOW):
+        self._hass = hass
+        self._ramp_window = ramp_window
+        self._dirty: dict[int, Entity] = dict()
+        self._handle: asyncio.Handle | None = None
+        self._deadline: float = 0.0
+
+    @callback
+    def schedule(self, entity: Entity, ramping: bool = False) -> None:
+        self._dirty[id(entity)] = entity
+        delay = self._ramp_window if ramping else 0.0
+        deadline = self._hass.loop.time() + delay
+        if self._handle is not None:
+            if deadline >= self._deadline:
+                return
+            self._handle.cancel()
+
+        self._deadline = deadline
+        if delay > 0:
+            self._handle = self._hass.loop.call_at(deadline, self._flush)
+        else:
+            self._handle = self._hass.loop.call_soon(self._flush)
+
+    @callback
+    def _flush(self) -> None:
+        self._handle = None
+        dirty, self._dirty = self._dirty, dict()
+        for entity in dirty.values():
+            # entity may have been removed since it was marked dirty
+            if entity.hass is not None:
+                entity.async_write_ha_state()
+
+
+@callback
+def get_write_coalescer(hass: HomeAssistant) -> StateWriteCoalescer:
+    coalescer = hass.data.get(DATA_WRITE_COALESCER)
+    if coalescer is None:
+        coalescer = hass.data[DATA_WRITE_COALESCER] = StateWriteCoalescer(hass)
+    return coalescer
+
+
 class TagoEntityHA:
     MAX_VALUE = 10000
 
@@ -33,7 +85,10 @@ class TagoEntityHA:
         return False
 
     def update(self) -> None:
-        self.schedule_update_ha_state()
+        if self.hass is None:
+            return
+        get_write_coalescer(self.hass).schedule(
+            self, ramping=self._entity.is_ramp_active)
 
     @property
     def type(self) -> str:
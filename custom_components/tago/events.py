@@ -0,0 +1,61 @@
+"""Relays keypad, motion and io events of a controller to the Home Assistant event bus."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import time
+
+from homeassistant.const import CONF_DEVICE_ID, CONF_TYPE
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util.read_only_dict import ReadOnlyDict
+
+from .const import ATTR_EVENT, ATTR_ID, ATTR_KEY, ATTR_KIND, CONF_SUBTYPE, EVENT_TAGO
+from .TagoNet import TagoDevice, TagoLatencyHistogram, TagoMessage
+
+
+def trigger_for(source: tuple) -> tuple[str, str]:
+    """Device trigger (type, subtype) of an (evt, id, key, event) input"""
+    evt, input_id, key, event = source
+    trigger_type = event or evt.removesuffix('_evt')
+    subtype = str(input_id) if key is None else f"{input_id} key {key}"
+    return trigger_type, subtype
+
+
+class InputEventRelay:
+    """Fires a tago_event for every input event of one controller.
+
+    Event data is built once per input and reused, so relaying an event is a
+    dict lookup and a bus fire. The time from the frame arriving to the event
+    being fired is kept in ``latency``.
+    """
+
+    def __init__(self, hass: HomeAssistant, device: TagoDevice, device_id: str,
+                 on_new_input: Callable[[], None] = None):
+        self._hass = hass
+        self._device_id = device_id
+        self._on_new_input = on_new_input
+        self._payloads: dict[tuple, ReadOnlyDict] = {
+            source: self._build(source) for source in device.inputs}
+        self.latency = TagoLatencyHistogram(TagoLatencyHistogram.LOCAL_BUCKETS)
+
+    def _build(self, source: tuple) -> ReadOnlyDict:
+        evt, input_id, key, event = source
+        trigger_type, subtype = trigger_for(source)
+        return ReadOnlyDict({
+            CONF_DEVICE_ID: self._device_id,
+            CONF_TYPE: trigger_type,
+            CONF_SUBTYPE: subtype,
+            ATTR_KIND: evt,
+            ATTR_ID: input_id,
+            ATTR_KEY: key,
+            ATTR_EVENT: event,
+        })
+
+    @callback
+    def __call__(self, source: tuple, msg: TagoMessage, received: float) -> None:
+        payload = self._payloads.get(source)
+        if payload is None:
+            payload = self._payloads[source] = self._build(source)
+            if self._on_new_input is not None:
+                self._on_new_input()
+        self._hass.bus.async_fire(EVENT_TAGO, payload)
+        self.latency.record(time.perf_counter() - received)
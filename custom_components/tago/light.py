@@ -153,6 +153,18 @@ class TagoLightHA(TagoEntityHA, LightEntity):
             # convert absolute colour temp to a ratio-metric value
             color_temp = (color_temp - self.min_color_temp_kelvin) / \
                 (self.max_color_temp_kelvin - self.min_color_temp_kelvin)
+
+        if rate is None:
+            # groups and scenes turn lights on one by one, the device batches them into one command
+            target = {TagoLight.PROP_BRIGHTNESS: brightness}
+            if color_temp is not None:
+                target[TagoLight.PROP_CT] = color_temp
+            elif xy_color is not None:
+                target[TagoLight.PROP_COLOUR] = xy_color
+            await self._entity._device.apply_scene({self._entity.unique_id: target}, duration=transition_time)
+            return
+
+        if color_temp is not None:
             await self._entity.set_ct(ct=color_temp, brightness=brightness, duration=transition_time, rate=rate)
             return
 
@@ -171,6 +183,9 @@ class TagoLightHA(TagoEntityHA, LightEntity):
         ## store current brightness level, to restore it in event of a turn on without any parameters
         if self.brightness > 0:
             self._last_brightness = self.brightness
+        if rate is None:
+            await self._entity._device.apply_scene({self._entity.unique_id: 0.0}, duration=transition_time)
+            return
         await self._entity.set_brightness(brightness=0, duration=transition_time, rate=rate)
 
     async def async_stop_transition(self):
@@ -1,14 +1,24 @@
+from datetime import timedelta
+import time
+
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.helpers.entity import DeviceInfo
 
 from .const import DOMAIN
 
+from .entity import get_write_coalescer
+from .events import InputEventRelay
 from .TagoNet import TagoDevice
 from . import generate_device_info
 
+# polling interval of the round trip diagnostic sensors
+SCAN_INTERVAL = timedelta(seconds=30)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -17,7 +27,14 @@ async def async_setup_entry(
 ) -> None:
     device = config_entry.runtime_data
     async_add_entities([
-        OfflineSensor(device, hass)
+        OfflineSensor(device, hass),
+        RoundTripSensor(device, 0.50),
+        RoundTripSensor(device, 0.95),
+        RequestRateSensor(device),
+        RequestTimeoutSensor(device),
+        PredictionMismatchSensor(device),
+        SuppressedCommandSensor(device),
+        EventLatencySensor(device, hass.data[DOMAIN][config_entry.entry_id]['events']),
     ])
 
 
@@ -40,4 +57,115 @@ class OfflineSensor(BinarySensorEntity):
 
     def on_state_updated(self):
         self._attr_is_on = self._device.is_connected
-        self.async_write_ha_state()
+        if self.hass is not None:
+            get_write_coalescer(self.hass).schedule(self)
+
+
+class DeviceDiagnosticSensor(SensorEntity):
+    """Base for polled diagnostic sensors that read the device's request statistics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = True
+
+    def __init__(self, device: TagoDevice, key: str, name: str):
+        self._device = device
+        self._attr_unique_id = f"{device.unique_id}:{key}"
+        self._attr_name = name
+        self._attr_device_info = generate_device_info(device)
+
+
+class RoundTripSensor(DeviceDiagnosticSensor):
+    """Round trip time percentile over all requests sent to the device."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 1
+
+    def __init__(self, device: TagoDevice, percentile: float):
+        label = f"p{int(percentile * 100)}"
+        super().__init__(device, f"rtt_{label}", f"Round Trip {label}")
+        self._percentile = percentile
+
+    @property
+    def native_value(self) -> float | None:
+        value = self._device.sender.latency.percentile(self._percentile)
+        return None if value is None else value * 1000
+
+
+class RequestRateSensor(DeviceDiagnosticSensor):
+    """Answered requests per second since the previous poll."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = "req/s"
+    _attr_suggested_display_precision = 2
+
+    def __init__(self, device: TagoDevice):
+        super().__init__(device, "request_rate", "Request Rate")
+        self._last_count = device.sender.latency.count
+        self._last_time = time.monotonic()
+
+    def update(self) -> None:
+        count = self._device.sender.latency.count
+        now = time.monotonic()
+        self._attr_native_value = (count - self._last_count) / (now - self._last_time)
+        self._last_count = count
+        self._last_time = now
+
+
+class RequestTimeoutSensor(DeviceDiagnosticSensor):
+    """Requests the device never answered."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, device: TagoDevice):
+        super().__init__(device, "request_timeouts", "Request Timeouts")
+
+    @property
+    def native_value(self) -> int:
+        return self._device.sender.latency.timeouts
+
+
+class PredictionMismatchSensor(DeviceDiagnosticSensor):
+    """Optimistic states the device contradicted or never confirmed."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, device: TagoDevice):
+        super().__init__(device, "prediction_mismatches", "Prediction Mismatches")
+
+    @property
+    def native_value(self) -> int:
+        stats = self._device.prediction_stats
+        return stats['mismatched'] + stats['rolled_back']
+
+
+class SuppressedCommandSensor(DeviceDiagnosticSensor):
+    """Commands not sent because the load was already in the requested state."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, device: TagoDevice):
+        super().__init__(device, "suppressed_commands", "Suppressed Commands")
+
+    @property
+    def native_value(self) -> int:
+        return self._device.suppressed_commands
+
+
+class EventLatencySensor(DeviceDiagnosticSensor):
+    """95th percentile time from an input event frame arriving to its bus event being fired."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 3
+
+    def __init__(self, device: TagoDevice, relay: InputEventRelay):
+        super().__init__(device, "event_latency_p95", "Event Latency p95")
+        self._relay = relay
+
+    @property
+    def native_value(self) -> float | None:
+        value = self._relay.latency.percentile(0.95)
+        return None if value is None else value * 1000
@@ -0,0 +1,82 @@
+"""Frames decoded per second by TagoMessage, compared with the previous decoder.
+
+Usage: python tools/bench_decode.py [--frames N]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'custom_components', 'tago'))
+
+import TagoNet  # noqa: E402
+from TagoNet import TagoDevice, TagoMessage  # noqa: E402
+
+
+class LegacyMessage:
+    """The decoder as it was before slots, orjson and the unmodified payload"""
+
+    def __init__(self):
+        self.rsp = None
+        self.data = None
+        self.src = None
+        self.ref = None
+        self.evt = None
+        self.dst = None
+        self.req = None
+
+    @classmethod
+    def from_payload(cls, message: str):
+        self = cls()
+        data = json.loads(message)
+        self.data = data
+        self.rsp = data.get('rsp')
+        self.src = data.get('src', '')
+        self.ref = data.get('ref')
+        self.evt = data.get('evt')
+        for key in ('ref', 'src', 'evt', 'rsp'):
+            if key in data:
+                del data[key]
+        return self
+
+
+def frames(count: int, loads: int, known: bool) -> list[str]:
+    prefix = 'L' if known else 'X'
+    return [json.dumps({
+        'evt': 'state_changed', 'src': f'{prefix}{i % loads}', 'brightness': i % 1000, 'ct': 500,
+        'x': 0.3127, 'y': 0.329,
+        'ramp': {'start': {'brightness': 0}, 'end': {'brightness': 1000}, 'duration': 1000, 'elapsed': 0},
+    }) for i in range(count)]
+
+
+def rate(fn, payloads: list[str]) -> float:
+    started = time.perf_counter()
+    for payload in payloads:
+        fn(payload)
+    return len(payloads) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200000)
+    args = parser.parse_args()
+
+    loads = 100
+    device = TagoDevice('127.0.0.1')
+    device.reconcile_nodes({'N0': {'loads': [{'id': f'L{i}', 'type': 'light_rgb'} for i in range(loads)]}})
+
+    known = frames(args.frames, loads, True)
+    unknown = frames(args.frames, loads, False)
+
+    print(f"decoder: {'orjson' if TagoNet.orjson is not None else 'json'}")
+    print(f"{'legacy from_payload':<32} {rate(LegacyMessage.from_payload, known):>12,.0f} frames/s")
+    print(f"{'TagoMessage.from_payload':<32} {rate(TagoMessage.from_payload, known):>12,.0f} frames/s")
+    print(f"{'decode_frame, known source':<32} {rate(device.decode_frame, known):>12,.0f} frames/s")
+    print(f"{'decode_frame, unknown source':<32} {rate(device.decode_frame, unknown):>12,.0f} frames/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""End-to-end command latency benchmark against the loopback emulator.
+
+Drives the real TagoLight, TagoSwitch, TagoFan and TagoCover APIs through a
+TagoDevice connected to tools/tago_emulator.py and reports p50/p95/p99 for
+command->ack and command->state_changed latency, plus the frame rate handled
+by the receive loop, at 10, 100 and 1000 loads.
+
+Usage: python tools/bench_latency.py [--samples N] [--output bench_latency.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'custom_components', 'tago'))
+sys.path.insert(0, HERE)
+
+from TagoNet import TagoCover, TagoDevice, TagoEntity, TagoFan, TagoLight, TagoSendQueue, TagoSwitch  # noqa: E402
+from tago_emulator import TagoEmulator  # noqa: E402
+
+LOADS_PER_NODE = 100
+RESPONSE_TIMEOUT = 5.0
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, math.ceil(p * len(ordered)) - 1)] * 1000
+
+    return {'count': len(ordered), 'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99)}
+
+
+def command_for(entity: TagoEntity, i: int):
+    # forced, a command for the state a load is already in would be dropped and never answered
+    on = bool(i % 2)
+    if isinstance(entity, TagoLight):
+        return entity.set_brightness(1.0 if on else 0.0, responseTimeout=RESPONSE_TIMEOUT, force=True)
+    if isinstance(entity, TagoSwitch):
+        return (entity.turn_on if on else entity.turn_off)(responseTimeout=RESPONSE_TIMEOUT, force=True)
+    if isinstance(entity, TagoFan):
+        return entity.set_speed(100 if on else 0, responseTimeout=RESPONSE_TIMEOUT, force=True)
+    return entity.move_to(0 if on else 100, responseTimeout=RESPONSE_TIMEOUT, force=True)
+
+
+async def bench(loads: int, samples: int, burst: int) -> dict:
+    nodes = max(1, math.ceil(loads / LOADS_PER_NODE))
+    emulator = TagoEmulator(nodes=nodes, loads=math.ceil(loads / nodes), seed=loads)
+    await emulator.start()
+
+    device = TagoDevice(emulator.hoststr)
+    resynced = asyncio.Event()
+    device.set_on_resync_complete(resynced.set)
+
+    connect_started = time.perf_counter()
+    await device.connect(timeout=30)
+    await asyncio.wait_for(resynced.wait(), 60)
+    connect_time = time.perf_counter() - connect_started
+
+    # receive loop throughput: count frames as they leave the dispatcher
+    dispatched = 0
+    dispatch = device.dispatch_message
+
+    async def counting_dispatch(msg):
+        nonlocal dispatched
+        dispatched += 1
+        await dispatch(msg)
+
+    device.dispatch_message = counting_dispatch
+
+    # command -> state_changed, resolved from the entity's state callback
+    waiting: dict[str, tuple[float, asyncio.Future]] = dict()
+    state_latency: dict[str, list[float]] = dict()
+
+    def on_state(entity: TagoEntity):
+        def callback():
+            pending = waiting.pop(entity.unique_id, None)
+            if pending is not None and not pending[1].done():
+                pending[1].set_result(time.perf_counter() - pending[0])
+        return callback
+
+    targets = [e for e in device.entities if type(e) in (TagoLight, TagoSwitch, TagoFan, TagoCover)]
+    for entity in targets:
+        entity.set_on_state_changed(on_state(entity))
+
+    ack_latency: dict[str, list[float]] = dict()
+    last_command: dict[str, float] = dict()
+    loop = asyncio.get_running_loop()
+    for i in range(samples):
+        entity = targets[i % len(targets)]
+        kind = type(entity).__name__
+        # with few loads the same one comes round within the send queue's spacing,
+        # wait it out so the hold does not count as command latency
+        wait = last_command.get(entity.unique_id, 0.0) + TagoSendQueue.SPACING - time.perf_counter()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        changed = loop.create_future()
+        started = time.perf_counter()
+        waiting[entity.unique_id] = (started, changed)
+        ack = await command_for(entity, i // len(targets))
+        last_command[entity.unique_id] = time.perf_counter()
+        if ack is not None:
+            ack_latency.setdefault(kind, list()).append(time.perf_counter() - started)
+        try:
+            state_latency.setdefault(kind, list()).append(await asyncio.wait_for(changed, RESPONSE_TIMEOUT))
+        except TimeoutError:
+            waiting.pop(entity.unique_id, None)
+
+    dispatched = 0
+    burst_started = time.perf_counter()
+    await emulator.burst(burst)
+    while dispatched < burst and time.perf_counter() - burst_started < 30:
+        await asyncio.sleep(0.001)
+    fps = dispatched / (time.perf_counter() - burst_started)
+
+    await device.disconnect(timeout=5)
+    await emulator.stop()
+
+    all_ack = [v for values in ack_latency.values() for v in values]
+    all_state = [v for values in state_latency.values() for v in values]
+    return {
+        'loads': len(device.entities),
+        'connect_resync_s': connect_time,
+        'command_ack': {'all': percentiles(all_ack), **{k: percentiles(v) for k, v in ack_latency.items()}},
+        'command_state': {'all': percentiles(all_state), **{k: percentiles(v) for k, v in state_latency.items()}},
+        'frames_per_second': fps,
+        'unmatched_frames': device.unmatched_frames,
+        'send_queue': device.sender.stats(),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    results = dict()
+    for loads in args.loads:
+        results[str(loads)] = await bench(loads, args.samples, args.burst)
+        r = results[str(loads)]
+        print(f"{loads:>5} loads: ack p50/p95/p99 "
+              f"{r['command_ack']['all'].get('p50_ms', 0):.2f}/{r['command_ack']['all'].get('p95_ms', 0):.2f}/"
+              f"{r['command_ack']['all'].get('p99_ms', 0):.2f} ms, state p50 "
+              f"{r['command_state']['all'].get('p50_ms', 0):.2f} ms, {r['frames_per_second']:.0f} frames/s")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--loads', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--samples', type=int, default=500)
+    parser.add_argument('--burst', type=int, default=20000, help='state_changed frames pushed for the frame rate test')
+    parser.add_argument('--output', default='bench_latency.json')
+    args = parser.parse_args()
+
+    with open(os.path.join(HERE, '..', 'custom_components', 'tago', 'manifest.json')) as f:
+        version = json.load(f).get('version')
+
+    results = asyncio.run(run(args))
+    report = {
+        'version': version,
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'samples': args.samples,
+        # same-load commands are spaced at least this far apart, outside the measured latency
+        'spacing_s': TagoSendQueue.SPACING,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
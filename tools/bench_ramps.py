@@ -0,0 +1,64 @@
+"""Per-tick cost of TagoRampEngine at increasing numbers of concurrent ramps.
+
+Usage: python tools/bench_ramps.py [--ticks N]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'custom_components', 'tago'))
+
+from TagoNet import TagoRampEngine  # noqa: E402
+
+
+class _Light:
+    def __init__(self, eid: str):
+        self.unique_id = eid
+
+    def ramp_update(self, values):
+        pass
+
+
+class _IdleTask:
+    def done(self) -> bool:
+        return False
+
+
+def bench(count: int, ticks: int, vectorised: bool) -> float:
+    engine = TagoRampEngine(vectorised=vectorised)
+    engine.VECTORISE_THRESHOLD = 0
+    # ticks are driven by hand below, keep the engine from scheduling its own
+    engine._task = _IdleTask()
+    duration = 1000 * 3600
+    for i in range(count):
+        engine.start(_Light(f'L{i}'), [0, 200, 0.3, None], [1000, 800, 0.5, None], duration, 0, now=0.0)
+
+    step = TagoRampEngine.UPDATE_INTERVAL
+    begin = time.perf_counter()
+    for i in range(1, ticks + 1):
+        engine.tick(now=i * step)
+    return (time.perf_counter() - begin) / ticks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=200)
+    args = parser.parse_args()
+
+    modes = [False]
+    if TagoRampEngine(vectorised=True).is_vectorised:
+        modes.append(True)
+
+    print(f"{'ramps':>6} {'mode':>10} {'us/tick':>10} {'us/ramp':>9}")
+    for count in (10, 100, 1000):
+        for vectorised in modes:
+            per_tick = bench(count, args.ticks, vectorised)
+            mode = 'numpy' if vectorised else 'sequential'
+            print(f"{count:>6} {mode:>10} {per_tick * 1e6:>10.1f} {per_tick * 1e6 / count:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
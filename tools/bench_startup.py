@@ -0,0 +1,91 @@
+"""Entry startup time with and without the persisted topology cache.
+
+Measures what async_setup_entry waits for before the platforms can be set up:
+without a cache the controller must connect and list its nodes, with a cache
+the entities are restored from the snapshot and the connection is started in
+the background. Time until live state has been resynced is shown for both.
+
+Usage: python tools/bench_startup.py [--latency MS] [--runs N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'custom_components', 'tago'))
+sys.path.insert(0, HERE)
+
+from TagoNet import TagoDevice  # noqa: E402
+from tago_emulator import TagoEmulator  # noqa: E402
+
+LOADS_PER_NODE = 100
+
+
+async def start(emulator: TagoEmulator, snapshot: dict | None) -> tuple[float, float, dict]:
+    """Seconds until setup could continue and until the state was resynced"""
+    device = TagoDevice(emulator.hoststr)
+    resynced = asyncio.Event()
+    device.set_on_resync_complete(resynced.set)
+
+    started = time.perf_counter()
+    if snapshot is not None:
+        device.restore(snapshot)
+        device.start()
+    else:
+        await device.connect(timeout=30)
+    ready = time.perf_counter() - started
+    await asyncio.wait_for(resynced.wait(), 60)
+    live = time.perf_counter() - started
+
+    # the snapshot goes through JSON like the Home Assistant store
+    snapshot = json.loads(json.dumps(device.snapshot()))
+    await device.disconnect(timeout=5)
+    return ready, live, snapshot
+
+
+async def bench(loads: int, latency: float, runs: int) -> dict:
+    nodes = max(1, math.ceil(loads / LOADS_PER_NODE))
+    emulator = TagoEmulator(nodes=nodes, loads=math.ceil(loads / nodes), latency=latency, seed=loads)
+    await emulator.start()
+
+    results = {'uncached': ([], []), 'cached': ([], [])}
+    snapshot = None
+    for _ in range(runs):
+        ready, live, snapshot = await start(emulator, None)
+        results['uncached'][0].append(ready)
+        results['uncached'][1].append(live)
+        ready, live, _ = await start(emulator, snapshot)
+        results['cached'][0].append(ready)
+        results['cached'][1].append(live)
+
+    await emulator.stop()
+    return {mode: {'ready_ms': statistics.median(ready) * 1000, 'live_ms': statistics.median(live) * 1000}
+            for mode, (ready, live) in results.items()}
+
+
+async def run(args: argparse.Namespace) -> None:
+    print(f"{'loads':>6} {'mode':>9} {'ready ms':>10} {'live ms':>10}")
+    for loads in args.loads:
+        result = await bench(loads, args.latency / 1000, args.runs)
+        for mode, r in result.items():
+            print(f"{loads:>6} {mode:>9} {r['ready_ms']:>10.2f} {r['live_ms']:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--loads', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--latency', type=float, default=20.0, help='emulated reply latency in ms')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
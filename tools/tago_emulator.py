@@ -0,0 +1,314 @@
+"""Loopback emulator of a Tago controller's websocket API.
+
+Speaks the protocol used by TagoDevice.connection_task (login and nonce
+authentication, list_nodes, get_state, set_light with ramps, optionally the
+multi-load set_lights, relay, fan and cover requests,
+state_changed/config_changed/keypad_evt events) so the
+integration can be load and latency tested without hardware.
+
+Usage: python tools/tago_emulator.py --port 8080 --nodes 4 --loads 16
+then point a TagoDevice at "127.0.0.1:8080".
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+import uuid
+
+from websockets.asyncio.server import ServerConnection, serve
+
+LIGHT_TYPES = ['light_dimmable', 'light_mono', 'light_ww', 'light_rgb', 'light_rgbww']
+# share of each load kind when building a topology
+LOAD_MIX = [('light', 0.7), ('relay_switch', 0.1), ('fan_adjustable', 0.1), ('cover_shades', 0.1)]
+MAX_VALUE = 1000
+
+
+class EmulatedLoad:
+    def __init__(self, eid: str, type: str, tag: str):
+        self.eid = eid
+        self.type = type
+        self.tag = tag
+        self.brightness = 0
+        self.ct = 500
+        self.x = 0.3127
+        self.y = 0.329
+        self.state = 'OFF'
+        self.value = 0
+        self.position = 0
+        self.target = 0
+
+    def describe(self) -> dict:
+        return {'id': self.eid, 'type': self.type, 'name': None, 'location': '', 'tag': self.tag}
+
+    def light_state(self) -> dict:
+        return {'brightness': self.brightness, 'ct': self.ct, 'x': self.x, 'y': self.y}
+
+    def state_json(self) -> dict:
+        if self.type.startswith('light'):
+            return self.light_state()
+        if self.type.startswith('fan'):
+            return {'value': self.value, 'is_on': self.value > 0}
+        if self.type.startswith('cover'):
+            return {'position': self.position, 'target': self.target}
+        return {'state': self.state}
+
+
+class TagoEmulator:
+    """A single emulated controller, serving any number of client connections."""
+
+    def __init__(self, serialnum: str = 'EMU0001', nodes: int = 1, loads: int = 8, authkey: str = None,
+                 latency: float = 0.0, jitter: float = 0.0, drop_rate: float = 0.0, seed: int = None,
+                 multi_load: bool = False):
+        self.serialnum = serialnum
+        self.model = 'EMULATOR'
+        self.firmware = '0.0.0'
+        self.authkey = authkey
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.features = ['multi_load'] if multi_load else []
+        self._random = random.Random(seed)
+        self._server = None
+        self._clients: set[ServerConnection] = set()
+        self.loads: dict[str, EmulatedLoad] = dict()
+        self.nodes: dict[str, list[EmulatedLoad]] = dict()
+        self.frames_in = 0
+        self.frames_out = 0
+        self._build(nodes, loads)
+
+    def _build(self, nodes: int, loads: int) -> None:
+        kinds = [kind for kind, _ in LOAD_MIX]
+        weights = [weight for _, weight in LOAD_MIX]
+        for n in range(nodes):
+            node_id = f'{self.serialnum}-N{n}'
+            self.nodes[node_id] = list()
+            for m in range(loads):
+                kind = self._random.choices(kinds, weights)[0]
+                if kind == 'light':
+                    kind = self._random.choice(LIGHT_TYPES)
+                load = EmulatedLoad(f'{node_id}L{m}', kind, f'N{n}.{m}')
+                self.nodes[node_id].append(load)
+                self.loads[load.eid] = load
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def hoststr(self) -> str:
+        return f'127.0.0.1:{self.port}'
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> None:
+        self._server = await serve(self.handler, host, port)
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def drop_connections(self) -> None:
+        """Abruptly close every client connection"""
+        for ws in list(self._clients):
+            ws.transport.abort()
+
+    async def send(self, ws: ServerConnection, frame: dict, delay: bool = True) -> None:
+        if delay and (self.latency or self.jitter):
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        try:
+            await ws.send(json.dumps(frame))
+            self.frames_out += 1
+        except Exception:
+            pass
+
+    async def broadcast(self, frame: dict) -> None:
+        await asyncio.gather(*(self.send(ws, frame, delay=False) for ws in list(self._clients)))
+
+    async def emit_state(self, load: EmulatedLoad, extra: dict = None) -> None:
+        frame = {'evt': 'state_changed', 'src': load.eid, **load.state_json()}
+        if extra:
+            frame.update(extra)
+        await self.broadcast(frame)
+
+    async def emit_keypad(self, keypad: str, key: int, event: str = 'key_pressed') -> None:
+        await self.broadcast({'evt': 'keypad_evt', 'src': self.serialnum, 'id': keypad, 'key': key, 'event': event})
+
+    async def emit_config_changed(self) -> None:
+        await self.broadcast({'evt': 'config_changed', 'src': self.serialnum})
+
+    async def burst(self, count: int) -> None:
+        """Push ``count`` state_changed events as fast as possible"""
+        loads = list(self.loads.values())
+        for i in range(count):
+            await self.emit_state(loads[i % len(loads)])
+
+    async def login(self, ws: ServerConnection) -> bool:
+        await ws.recv()
+        hello = {'serialnum': self.serialnum, 'model': self.model, 'firmware': self.firmware,
+                 'features': self.features}
+        if not self.authkey:
+            await ws.send(json.dumps({'status': 200, **hello}))
+            return True
+
+        server_nonce = uuid.uuid4().hex
+        await ws.send(json.dumps({'status': 401, 'nonce': server_nonce, **hello}))
+        reply = json.loads(await ws.recv())
+        sha256 = hashlib.sha256()
+        sha256.update((reply.get('nonce', '') + self.authkey + server_nonce).encode('utf-8'))
+        if reply.get('auth') != sha256.hexdigest():
+            await ws.send(json.dumps({'status': 403}))
+            return False
+
+        await ws.send(json.dumps({'status': 200}))
+        return True
+
+    async def handler(self, ws: ServerConnection) -> None:
+        if not await self.login(ws):
+            return
+
+        self._clients.add(ws)
+        try:
+            async for message in ws:
+                self.frames_in += 1
+                if self.drop_rate and self._random.random() < self.drop_rate:
+                    ws.transport.abort()
+                    return
+                try:
+                    asyncio.create_task(self.handle_request(ws, json.loads(message)))
+                except Exception as e:
+                    logging.exception(e)
+        finally:
+            self._clients.discard(ws)
+
+    async def handle_request(self, ws: ServerConnection, frame: dict) -> None:
+        req = frame.get('req')
+        ref = frame.get('ref')
+        dst = frame.get('dst') or self.serialnum
+        reply = {'rsp': req, 'ref': ref, 'src': dst}
+
+        if req == 'list_nodes':
+            reply['nodes'] = {node_id: {'loads': [load.describe() for load in loads]}
+                              for node_id, loads in self.nodes.items()}
+            await self.send(ws, reply)
+            return
+
+        if dst == self.serialnum and req == 'set_lights' and self.features:
+            await self.send(ws, reply)
+            for entry in frame.get('loads', []):
+                load = self.loads.get(entry.get('id'))
+                if load is not None:
+                    extra = self.apply_light(load, entry)
+                    await self.send(ws, {'evt': 'state_changed', 'src': load.eid, **load.state_json(), **(extra or {})},
+                                    delay=False)
+            return
+
+        if dst == self.serialnum:
+            await self.send(ws, reply)
+            if req == 'reboot':
+                await self.drop_connections()
+            return
+
+        load = self.loads.get(dst)
+        if load is None:
+            await self.send(ws, {**reply, 'error': 'unknown destination'})
+            return
+
+        if req == 'get_state':
+            await self.send(ws, {**reply, **load.state_json()})
+            return
+
+        await self.send(ws, reply)
+        extra = None
+        if req == 'set_light':
+            extra = self.apply_light(load, frame)
+        elif req in ('turn_on', 'turn_off'):
+            on = req == 'turn_on'
+            load.state = 'ON' if on else 'OFF'
+            if load.type.startswith('fan'):
+                load.value = (load.value or MAX_VALUE) if on else 0
+        elif req == 'set_fan':
+            load.value = frame.get('value', [load.value])[0]
+        elif req == 'move_to':
+            load.target = frame.get('target', load.target)
+            load.position = load.target
+        elif req in ('stop_ramp', 'stop_move', 'light_effect'):
+            pass
+        else:
+            return
+
+        await self.send(ws, {'evt': 'state_changed', 'src': load.eid, **load.state_json(), **(extra or {})})
+
+    def apply_light(self, load: EmulatedLoad, frame: dict) -> dict | None:
+        start = load.light_state()
+        if 'brightness' in frame:
+            load.brightness = frame['brightness']
+        elif 'brightness+' in frame:
+            load.brightness = load.brightness + frame['brightness+']
+        load.brightness = max(0, min(MAX_VALUE, load.brightness))
+        load.ct = frame.get('ct', load.ct)
+        load.x = frame.get('x', load.x)
+        load.y = frame.get('y', load.y)
+
+        duration = frame.get('duration')
+        if duration is None and frame.get('rate'):
+            duration = int(abs(load.brightness - start['brightness']) / MAX_VALUE * frame['rate'])
+        if not duration:
+            return None
+        return {'ramp': {'start': start, 'end': load.light_state(), 'duration': duration, 'elapsed': 0}}
+
+
+async def run(args: argparse.Namespace) -> None:
+    emulator = TagoEmulator(serialnum=args.serial, nodes=args.nodes, loads=args.loads, authkey=args.authkey,
+                            latency=args.latency / 1000, jitter=args.jitter / 1000, drop_rate=args.drop_rate,
+                            seed=args.seed, multi_load=args.multi_load)
+    await emulator.start(args.host, args.port)
+    logging.info("emulating %s with %d loads on %s:%d", emulator.serialnum,
+                 len(emulator.loads), args.host, emulator.port)
+
+    keypad_next = time.monotonic() + args.keypad_interval if args.keypad_interval else None
+    drop_next = time.monotonic() + args.drop_interval if args.drop_interval else None
+    try:
+        while True:
+            await asyncio.sleep(0.1)
+            now = time.monotonic()
+            if keypad_next and now >= keypad_next:
+                await emulator.emit_keypad('K0', random.randint(1, 8))
+                keypad_next = now + args.keypad_interval
+            if drop_next and now >= drop_next:
+                await emulator.drop_connections()
+                drop_next = now + args.drop_interval
+    finally:
+        await emulator.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--serial', default='EMU0001')
+    parser.add_argument('--nodes', type=int, default=1)
+    parser.add_argument('--loads', type=int, default=8, help='loads per node')
+    parser.add_argument('--authkey', default=None)
+    parser.add_argument('--latency', type=float, default=0.0, help='reply latency in ms')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency in ms')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='chance per request to drop the connection')
+    parser.add_argument('--drop-interval', type=float, default=0.0, help='drop all connections every N seconds')
+    parser.add_argument('--keypad-interval', type=float, default=0.0, help='emit a keypad event every N seconds')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--multi-load', action='store_true', help='accept set_lights frames for many loads')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
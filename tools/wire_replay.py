@@ -0,0 +1,107 @@
+"""Record raw websocket traffic from a controller and replay it offline.
+
+Recording connects a TagoDevice with the wire recorder enabled and dumps the
+ring buffer when done. Replaying feeds the incoming frames of a recording
+through TagoMessage.from_payload and the device dispatcher (and so each
+entity's handle_message) at real or maximum speed, optionally under cProfile.
+
+Usage:
+    python tools/wire_replay.py record HOST[:PORT] out.rec.gz [--authkey KEY] [--seconds 60]
+    python tools/wire_replay.py replay out.rec.gz [--speed real|max] [--profile]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import cProfile
+import os
+import pstats
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'custom_components', 'tago'))
+
+from TagoNet import TagoDevice, TagoMessage, TagoWireRecorder  # noqa: E402
+
+
+async def record(args: argparse.Namespace) -> None:
+    device = TagoDevice(args.host, args.authkey)
+    recorder = device.enable_recorder(args.size)
+    await device.connect(timeout=10)
+    print(f"recording {device.unique_id} for {args.seconds}s")
+    try:
+        await asyncio.sleep(args.seconds)
+    finally:
+        await device.disconnect(timeout=5)
+    written = recorder.dump(args.path)
+    print(f"wrote {written} frames to {args.path}")
+
+
+async def replay(args: argparse.Namespace) -> dict:
+    device = TagoDevice('replay')
+    frames = 0
+    previous = None
+    started = time.perf_counter()
+
+    for timestamp, direction, payload in TagoWireRecorder.load(args.path):
+        if direction != TagoWireRecorder.DIRECTION_IN:
+            continue
+        if args.speed == 'real' and previous is not None and timestamp > previous:
+            await asyncio.sleep(timestamp - previous)
+        previous = timestamp
+
+        msg = TagoMessage.from_payload(payload)
+        if msg.is_response([TagoDevice.REQ_LIST_NODES]):
+            # the node list reply carries the controller id and topology
+            device.restore({'serialnum': msg.src, TagoDevice.PROP_NODES: msg.data.get(TagoDevice.PROP_NODES, dict())})
+        else:
+            await device.dispatch_message(msg)
+        frames += 1
+
+    elapsed = time.perf_counter() - started
+    device.ramps.cancel_all()
+    return {
+        'frames': frames,
+        'seconds': elapsed,
+        'frames_per_second': frames / elapsed if elapsed else 0.0,
+        'entities': len(device.entities),
+        'unmatched_frames': device.unmatched_frames,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rec = commands.add_parser('record')
+    rec.add_argument('host')
+    rec.add_argument('path')
+    rec.add_argument('--authkey', default='')
+    rec.add_argument('--seconds', type=float, default=60)
+    rec.add_argument('--size', type=int, default=TagoWireRecorder.SIZE, help='frames kept in the ring buffer')
+
+    rep = commands.add_parser('replay')
+    rep.add_argument('path')
+    rep.add_argument('--speed', choices=['real', 'max'], default='max')
+    rep.add_argument('--profile', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        asyncio.run(record(args))
+        return
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    result = asyncio.run(replay(args))
+    if profiler:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+
+    print(f"replayed {result['frames']} frames for {result['entities']} entities in "
+          f"{result['seconds']:.3f}s ({result['frames_per_second']:,.0f} frames/s, "
+          f"{result['unmatched_frames']} unmatched)")
+
+
+if __name__ == '__main__':
+    main()